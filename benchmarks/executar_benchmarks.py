@@ -0,0 +1,327 @@
+"""
+Benchmarks offline dos caminhos críticos da coleta, usando só dados do
+repositório:
+
+- extração das tabelas das páginas do FBref guardadas em
+  performance_analyst/raw_data_store/;
+- normalização das partidas e tabelas filhas (payloads reconstruídos a
+  partir dos CSVs da football-data.org e multiplicados por 1x/10x/100x);
+- tradução de colunas de estatisticas_por_jogo.py;
+- escrita em CSV e Parquet.
+
+Cada cenário é medido em tempo (mediana de várias repetições) e pico de
+memória (tracemalloc) e comparado ao baseline versionado em
+benchmarks/baseline.json. Os tempos são comparados em relação a uma carga
+de calibração medida no mesmo processo, para que o baseline valha em
+máquinas diferentes. Uma piora acima do limite faz o script terminar com
+código 1; sem baseline, termina com código 2.
+
+Uso:
+    python benchmarks/executar_benchmarks.py                    # compara com o baseline
+    python benchmarks/executar_benchmarks.py --salvar-baseline  # grava o baseline atual
+    python benchmarks/executar_benchmarks.py --filtro normalizacao --escalas 1,10,100
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import time
+from fnmatch import fnmatch
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+RAIZ_REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ_REPO / "performance_analyst"))
+
+import pandas as pd
+from lxml import html
+from soccerdata.fbref import _parse_table
+
+from normalizacao_partidas import normalizar_partidas, gerar_tabelas_filhas
+from armazenamento_parquet import salvar_dataset
+from armazenamento_raw_data import LojaRawData
+from estatisticas_por_jogo import traduzir_colunas
+
+PASTA_FOOTBALL_DATA = RAIZ_REPO / "dados_coletados_football_data_org"
+CAMINHO_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# Piora relativa tolerada antes de acusar regressão (0.25 = 25%)
+LIMITE_REGRESSAO = float(os.getenv("BENCHMARK_LIMITE_REGRESSAO", "0.25"))
+# 100x leva minutos por cenário; use --escalas 1,10,100 quando precisar
+ESCALAS_PADRAO = [1, 10]
+REPETICOES_PADRAO = 5
+
+# Colunas acrescentadas pelo coletor, que não existem no payload da API
+COLUNAS_DO_COLETOR = ["competition_id_api", "competition_code_api", "competition_name_api", "season_filter_year"]
+
+
+# Fixtures
+
+def paginas_fbref():
+    """
+    Conteúdo das páginas de estatísticas de times guardadas na loja de raw_data.
+    Páginas de temporadas ainda sem a tabela (futuras) ficam de fora.
+    """
+    loja = LojaRawData()
+    nomes = sorted(n for n in loja.indice["paginas"] if fnmatch(n, "teams_*_stats.html"))
+    paginas = (loja.ler_pagina(n) for n in nomes)
+    return [c for c in paginas if b'id="stats_squads_standard_for"' in c or b'id="stats_teams_standard_for"' in c]
+
+
+def extrair_tabelas_fbref(paginas):
+    """Mesmo caminho do soccerdata: lxml, seleção da tabela e _parse_table."""
+    tabelas = []
+    for conteudo in paginas:
+        arvore = html.fromstring(conteudo)
+        (tabela_html,) = arvore.xpath("//table[@id='stats_squads_standard_for' or @id='stats_teams_standard_for']")
+        df = _parse_table(tabela_html)
+        tabelas.append(df.rename(columns={"Squad": "team", "# Pl": "players_used"}))
+    return tabelas
+
+
+def _aninhar(linha):
+    """Desfaz o json_normalize(sep='_') de uma linha do CSV: 'homeTeam_id' -> {'homeTeam': {'id': ...}}."""
+    partida = {}
+    for coluna, valor in linha.items():
+        if isinstance(valor, float) and pd.isna(valor):
+            valor = None
+        partes = coluna.split("_")
+        destino = partida
+        for parte in partes[:-1]:
+            if not isinstance(destino.get(parte), dict):
+                destino[parte] = {}
+            destino = destino[parte]
+        destino[partes[-1]] = valor
+    return partida
+
+
+def _detalhes_sinteticos(partida):
+    """Gols, cartões, substituições, árbitros e escalações no formato do X-Unfold-*."""
+    id_partida = partida["id"]
+    placar = (partida.get("score") or {}).get("fullTime") or {}
+    lados = {"homeTeam": placar.get("home") or 0, "awayTeam": placar.get("away") or 0}
+    gols, cartoes, substituicoes = [], [], []
+    for lado, total in lados.items():
+        time_ = {"id": partida[lado]["id"], "name": partida[lado]["name"]}
+        for n in range(int(total)):
+            gols.append({"minute": 10 + 7 * n, "injuryTime": None, "type": "REGULAR", "team": time_,
+                         "scorer": {"id": id_partida * 100 + n, "name": f"Jogador {n}"},
+                         "assist": None, "score": {"home": None, "away": None}})
+        cartoes.append({"minute": 40, "team": time_, "player": {"id": id_partida * 100 + 50, "name": "Jogador 50"}, "card": "YELLOW"})
+        for n in range(3):
+            substituicoes.append({"minute": 60 + 5 * n, "team": time_,
+                                  "playerOut": {"id": id_partida * 100 + n, "name": f"Jogador {n}"},
+                                  "playerIn": {"id": id_partida * 100 + 20 + n, "name": f"Jogador {20 + n}"}})
+        partida[lado]["lineup"] = [{"id": id_partida * 100 + n, "name": f"Jogador {n}", "position": "Midfield", "shirtNumber": n + 1} for n in range(11)]
+        partida[lado]["bench"] = [{"id": id_partida * 100 + 20 + n, "name": f"Jogador {20 + n}", "position": None, "shirtNumber": 20 + n} for n in range(9)]
+    partida.update({
+        "goals": gols,
+        "bookings": cartoes,
+        "substitutions": substituicoes,
+        "referees": [{"id": 1, "name": "Árbitro", "type": "REFEREE", "nationality": "Brazil"}],
+    })
+    return partida
+
+
+def payload_partidas(escala=1):
+    """
+    Partidas no formato da API reconstruídas a partir dos CSVs gravados,
+    com detalhes desdobrados sintéticos, repetidas `escala` vezes com novos ids.
+    """
+    base = []
+    for caminho_csv in sorted(PASTA_FOOTBALL_DATA.glob("partidas_competicao/*/*/*.csv")):
+        df = pd.read_csv(caminho_csv, encoding="utf-8-sig").drop(columns=COLUNAS_DO_COLETOR, errors="ignore")
+        base.extend(_aninhar(linha) for linha in df.to_dict("records"))
+
+    partidas = []
+    for copia in range(escala):
+        for original in base:
+            partida = json.loads(json.dumps(original))
+            partida["id"] = int(original["id"]) + copia * 10_000_000
+            partidas.append(_detalhes_sinteticos(partida))
+    return partidas
+
+
+# Cenários
+
+def montar_cenarios(escalas):
+    """
+    Lista de (nome, função). As fixtures são preparadas aqui, fora da
+    medição; cada função executa apenas o caminho medido.
+    """
+    cenarios = []
+
+    paginas = paginas_fbref()
+    cenarios.append((f"extracao_html_fbref_{len(paginas)}_paginas", lambda: extrair_tabelas_fbref(paginas)))
+
+    tabela_fbref = pd.concat(extrair_tabelas_fbref(paginas), ignore_index=True)
+    for escala in escalas:
+        tabela = pd.concat([tabela_fbref] * escala, ignore_index=True)
+        cenarios.append((f"traducao_colunas_x{escala}", lambda t=tabela: traduzir_colunas(t)))
+
+    for escala in escalas:
+        partidas = payload_partidas(escala)
+        cenarios.append((f"normalizacao_partidas_x{escala}", lambda p=partidas: normalizar_partidas(p)))
+        cenarios.append((f"tabelas_filhas_x{escala}", lambda p=partidas: list(gerar_tabelas_filhas(p))))
+
+        df_partidas = normalizar_partidas(partidas)
+        cenarios.append((f"escrita_csv_partidas_x{escala}", lambda d=df_partidas: escrever_csv(d)))
+        cenarios.append((f"escrita_parquet_partidas_x{escala}", lambda d=df_partidas: escrever_parquet(d)))
+
+    cenarios.append(("escrita_csv_fbref", lambda: escrever_csv(tabela_fbref)))
+    cenarios.append(("escrita_parquet_fbref", lambda: escrever_parquet(tabela_fbref)))
+    return cenarios
+
+
+def escrever_csv(df):
+    with tempfile.TemporaryDirectory() as pasta:
+        df.to_csv(os.path.join(pasta, "tabela.csv"), index=False, encoding="utf-8-sig")
+
+
+def escrever_parquet(df):
+    # Pasta nova a cada execução: salvar_dataset não reescreve conteúdo idêntico
+    pasta = tempfile.mkdtemp()
+    try:
+        salvar_dataset(df, "benchmark", "liga", "temporada", "tabela", raiz=pasta)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+# Medição e baseline
+
+def carga_calibracao():
+    """Laço em Python puro e agregação no pandas: a unidade em que os tempos são comparados."""
+    total = 0
+    for i in range(300_000):
+        total += i % 7
+    df = pd.DataFrame({"chave": [i % 97 for i in range(200_000)], "valor": range(200_000)})
+    df.groupby("chave")["valor"].sum()
+    return total
+
+
+def calibrar(repeticoes=REPETICOES_PADRAO):
+    """Mediana do tempo da carga de calibração nesta máquina e neste momento."""
+    return medir(carga_calibracao, repeticoes)["mediana_s"]
+
+
+def medir(funcao, repeticoes):
+    """Mediana/mínimo do tempo em `repeticoes` execuções e pico de memória em uma execução extra."""
+    funcao()  # aquecimento (imports, caches do pandas)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "mediana_s": round(statistics.median(tempos), 5),
+        "min_s": round(min(tempos), 5),
+        "pico_memoria_mb": round(pico / 1e6, 3),
+    }
+
+
+def carregar_baseline(caminho=CAMINHO_BASELINE):
+    if not Path(caminho).exists():
+        return None
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_baseline(resultados, caminho=CAMINHO_BASELINE):
+    baseline = carregar_baseline(caminho) or {"resultados": {}}
+    baseline.update({
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "maquina": platform.platform(),
+    })
+    baseline["resultados"].update(resultados)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+
+def comparar(nome, atual, baseline, limite):
+    """
+    Lista das métricas que pioraram mais que `limite` em relação ao
+    baseline. O tempo é comparado pela mediana relativa à calibração; o
+    pico de memória, em MB.
+    """
+    anterior = (baseline or {}).get("resultados", {}).get(nome)
+    if anterior is None:
+        return []
+    pioras = []
+    for metrica in ("mediana_relativa", "pico_memoria_mb"):
+        if anterior.get(metrica) and atual[metrica] > anterior[metrica] * (1 + limite):
+            pioras.append(f"{metrica} {anterior[metrica]} -> {atual[metrica]} (+{atual[metrica] / anterior[metrica] - 1:.0%})")
+    return pioras
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline da normalização, extração e escrita.")
+    parser.add_argument("--escalas", default=",".join(map(str, ESCALAS_PADRAO)), help="multiplicadores do payload de partidas (ex.: 1,10,100)")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_PADRAO)
+    parser.add_argument("--filtro", default=None, help="executa só os cenários cujo nome contém este texto")
+    parser.add_argument("--limite", type=float, default=LIMITE_REGRESSAO, help="piora relativa tolerada (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=str(CAMINHO_BASELINE))
+    parser.add_argument("--salvar-baseline", action="store_true", help="grava os resultados como novo baseline")
+    parser.add_argument("--saida", default=None, help="grava os resultados desta execução em JSON")
+    args = parser.parse_args()
+
+    escalas = [int(e) for e in args.escalas.split(",") if e]
+    baseline = carregar_baseline(args.baseline)
+    if baseline is None and not args.salvar_baseline:
+        print(f"Erro: baseline {args.baseline} não encontrado; sem ele não há comparação. "
+              "Rode com --salvar-baseline para criá-lo.")
+        return 2
+
+    print("Preparando fixtures...")
+    cenarios = [(nome, funcao) for nome, funcao in montar_cenarios(escalas) if not args.filtro or args.filtro in nome]
+    calibracao = calibrar(args.repeticoes)
+    print(f"Calibração: {calibracao:.4f} s")
+
+    resultados, regressoes = {}, {}
+    print(f"\n{'cenário':<40} {'mediana (s)':>12} {'relativa':>10} {'mín (s)':>10} {'pico (MB)':>10}")
+    for nome, funcao in cenarios:
+        resultado = medir(funcao, args.repeticoes)
+        resultado["mediana_relativa"] = round(resultado["mediana_s"] / calibracao, 4)
+        resultados[nome] = resultado
+        pioras = comparar(nome, resultado, baseline, args.limite)
+        if pioras:
+            regressoes[nome] = pioras
+        marca = "  REGRESSÃO" if pioras else ""
+        if baseline is not None and nome not in baseline.get("resultados", {}):
+            marca = "  (fora do baseline)"
+        print(f"{nome:<40} {resultado['mediana_s']:>12.4f} {resultado['mediana_relativa']:>10.2f} "
+              f"{resultado['min_s']:>10.4f} {resultado['pico_memoria_mb']:>10.2f}{marca}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+    if args.salvar_baseline:
+        salvar_baseline(resultados, args.baseline)
+        print(f"\nBaseline gravado em {args.baseline}")
+        return 0
+
+    if regressoes:
+        print(f"\n{len(regressoes)} cenário(s) acima do limite de {args.limite:.0%}:")
+        for nome, pioras in regressoes.items():
+            for piora in pioras:
+                print(f"  - {nome}: {piora}")
+        return 1
+    print("\nNenhuma regressão em relação ao baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+import os
+import io
+import json
+import hashlib
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from manifesto_coleta import hash_arquivo
+from telemetria import contar, etapa
+
+# Um único dataset na raiz do repositório, independente do diretório de execução
+PASTA_DATASET = os.getenv("PASTA_DATASET", str(Path(__file__).resolve().parent.parent / "dados_parquet"))
+
+# Ordem das partições no caminho: fonte=.../liga=.../temporada=.../stat_type=...
+ORDEM_PARTICOES = ["fonte", "liga", "temporada", "stat_type"]
+
+CHAVE_METADADOS = b"performance_analyst"
+
+# Colunas de texto com até esta fração de valores distintos viram categóricas
+LIMITE_CATEGORIA = 0.5
+
+
+def _nome_coluna(coluna):
+    """Achata um cabeçalho de dois níveis do FBref: ('Total', 'Cmp') -> 'Total_Cmp'."""
+    if not isinstance(coluna, tuple):
+        return str(coluna)
+    partes = [str(p) for p in coluna if str(p) and not str(p).startswith("Unnamed")]
+    return "_".join(partes) or "_".join(str(p) for p in coluna)
+
+
+def compactar_tipos(df, tipos=None):
+    """
+    Reduz o uso de memória/disco: inteiros e floats no menor tipo que
+    comporta os valores e textos repetitivos como categóricos. As colunas
+    em `tipos` (coluna -> dtype) recebem o dtype informado, igual em todas
+    as partições, em vez do menor que cabe nos valores desta.
+    """
+    df = df.copy()
+    tipos = tipos or {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if coluna in tipos:
+            df[coluna] = serie.astype(tipos[coluna])
+            continue
+        if pd.api.types.is_bool_dtype(serie):
+            continue
+        if pd.api.types.is_integer_dtype(serie):
+            df[coluna] = pd.to_numeric(serie, downcast="integer")
+        elif pd.api.types.is_float_dtype(serie):
+            df[coluna] = pd.to_numeric(serie, downcast="float")
+        elif pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+            if len(serie) and serie.nunique(dropna=True) / len(serie) <= LIMITE_CATEGORIA:
+                df[coluna] = serie.astype("category")
+    return df
+
+
+def preparar_para_parquet(df, tipos=None):
+    """
+    Converte índice e cabeçalhos de vários níveis em colunas simples e
+    devolve (df, metadados) com o necessário para reconstruí-los na leitura.
+    """
+    nomes_indice = [n for n in df.index.names if n is not None]
+    if nomes_indice:
+        df = df.reset_index()
+    else:
+        df = df.reset_index(drop=True)
+
+    colunas_originais = {}
+    nomes = []
+    for coluna in df.columns:
+        nome = _nome_coluna(coluna)
+        while nome in colunas_originais:
+            nome += "_"
+        colunas_originais[nome] = list(coluna) if isinstance(coluna, tuple) else coluna
+        nomes.append(nome)
+    df.columns = nomes
+
+    metadados = {"indice": [_nome_coluna(n) for n in nomes_indice], "colunas": colunas_originais}
+    return compactar_tipos(df, tipos), metadados
+
+
+def caminho_particao(raiz=PASTA_DATASET, **particoes):
+    """Diretório Hive para as partições informadas, na ordem de ORDEM_PARTICOES."""
+    caminho = Path(raiz)
+    for chave in ORDEM_PARTICOES:
+        if particoes.get(chave) is not None:
+            caminho = caminho / f"{chave}={quote(str(particoes[chave]), safe=' ')}"
+    return caminho
+
+
+def salvar_dataset(df, fonte, liga, temporada, stat_type, raiz=PASTA_DATASET, nome_parte="parte-0", tipos=None):
+    """
+    Grava o DataFrame como uma partição Parquet (zstd) preservando índice e
+    cabeçalhos de vários níveis. `tipos` fixa o dtype de colunas que não
+    devem ser compactadas. Se o conteúdo for idêntico ao arquivo
+    existente, nada é reescrito. Retorna (caminho, alterado).
+    """
+    with etapa("escrita_parquet"):
+        df_plano, metadados = preparar_para_parquet(df, tipos)
+        tabela = pa.Table.from_pandas(df_plano, preserve_index=False)
+        esquema = tabela.schema.with_metadata({
+            **(tabela.schema.metadata or {}),
+            CHAVE_METADADOS: json.dumps(metadados, ensure_ascii=False).encode("utf-8"),
+        })
+        tabela = tabela.replace_schema_metadata(esquema.metadata)
+
+        buffer = io.BytesIO()
+        pq.write_table(tabela, buffer, compression="zstd")
+        conteudo = buffer.getvalue()
+
+        pasta = caminho_particao(raiz, fonte=fonte, liga=liga, temporada=temporada, stat_type=stat_type)
+        caminho = pasta / f"{nome_parte}.parquet"
+        if hash_arquivo(caminho) == hashlib.md5(conteudo).hexdigest():
+            contar("parquet_sem_alteracao")
+            return caminho, False
+
+        pasta.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_suffix(".tmp")
+        temporario.write_bytes(conteudo)
+        os.replace(temporario, caminho)
+    contar("parquet_arquivos_gravados")
+    contar("parquet_linhas", len(df_plano))
+    contar("parquet_bytes", len(conteudo))
+    return caminho, True
+
+
+def _como_lista(valor):
+    if valor is None:
+        return None
+    return [str(v) for v in valor] if isinstance(valor, (list, tuple, set)) else [str(valor)]
+
+
+def listar_arquivos(raiz=PASTA_DATASET, **particoes):
+    """
+    Arquivos Parquet das partições pedidas. Os diretórios que não casam
+    são descartados pelo nome, sem abrir nenhum arquivo. Níveis omitidos na
+    gravação (partição None em salvar_dataset) são pulados.
+    """
+    candidatos = [Path(raiz)]
+    for chave in ORDEM_PARTICOES:
+        valores = _como_lista(particoes.get(chave))
+        proximos = []
+        for pasta in candidatos:
+            if not pasta.is_dir():
+                continue
+            if valores is None:
+                subpastas = [p for p in pasta.iterdir() if p.is_dir() and p.name.startswith(f"{chave}=")]
+                if subpastas or pasta == Path(raiz):
+                    proximos.extend(subpastas)
+                else:
+                    proximos.append(pasta)
+            else:
+                proximos.extend(pasta / f"{chave}={quote(v, safe=' ')}" for v in valores)
+        candidatos = proximos
+    return sorted(a for pasta in candidatos if pasta.is_dir() for a in pasta.glob("*.parquet"))
+
+
+def _restaurar_estrutura(df, metadados):
+    """Reconstrói o índice e os cabeçalhos de vários níveis gravados nos metadados."""
+    indice = [c for c in metadados.get("indice", []) if c in df.columns]
+    if indice:
+        df = df.set_index(indice)
+
+    originais = metadados.get("colunas", {})
+    tuplas = [originais.get(c) for c in df.columns]
+    niveis = {len(t) for t in tuplas if isinstance(t, list)}
+    if len(niveis) == 1:
+        profundidade = niveis.pop()
+        df.columns = pd.MultiIndex.from_tuples([
+            tuple(t) if isinstance(t, list) else (c,) + ("",) * (profundidade - 1)
+            for c, t in zip(df.columns, tuplas)
+        ])
+    return df
+
+
+def _unificar_esquemas(esquemas):
+    """
+    Une os esquemas das partições. A decisão de usar categóricas é tomada
+    por arquivo, então um campo só continua dicionário se for dicionário em
+    todos os arquivos; nos demais casos é lido pelo tipo dos valores.
+    """
+    dicionario_em_todos = {}
+    for esquema in esquemas:
+        for campo in esquema:
+            eh_dicionario = pa.types.is_dictionary(campo.type)
+            dicionario_em_todos[campo.name] = dicionario_em_todos.get(campo.name, True) and eh_dicionario
+
+    normalizados = []
+    for esquema in esquemas:
+        campos = []
+        for campo in esquema.remove_metadata():
+            if pa.types.is_dictionary(campo.type):
+                tipo = pa.dictionary(pa.int32(), campo.type.value_type) if dicionario_em_todos[campo.name] else campo.type.value_type
+                campo = campo.with_type(tipo)
+            campos.append(campo)
+        normalizados.append(pa.schema(campos))
+    return pa.unify_schemas(normalizados, promote_options="permissive")
+
+
+def carregar_dataset(fonte=None, liga=None, temporada=None, stat_type=None, colunas=None,
+                     filtros=None, raiz=PASTA_DATASET, restaurar_estrutura=True):
+    """
+    Lê o dataset particionado lendo só o necessário.
+
+    - fonte/liga/temporada/stat_type: valor ou lista de valores; partições
+      que não casam nem são abertas.
+    - colunas: nomes achatados a projetar (ex.: ['player', 'Total_Cmp']);
+      as colunas do índice são incluídas automaticamente.
+    - filtros: predicados no formato do pyarrow, ex.: [('age', '>=', 30)],
+      aplicados por row group durante a leitura.
+    - restaurar_estrutura: reconstrói índice e cabeçalhos de dois níveis.
+    """
+    arquivos = listar_arquivos(raiz, fonte=fonte, liga=liga, temporada=temporada, stat_type=stat_type)
+    if not arquivos:
+        return pd.DataFrame()
+
+    esquemas = [pq.read_schema(a) for a in arquivos]
+    metadados = {"indice": [], "colunas": {}}
+    for esquema in esquemas:
+        extra = json.loads((esquema.metadata or {}).get(CHAVE_METADADOS, b"{}"))
+        for nome in extra.get("indice", []):
+            if nome not in metadados["indice"]:
+                metadados["indice"].append(nome)
+        metadados["colunas"].update(extra.get("colunas", {}))
+
+    esquema_particoes = pa.schema([(chave, pa.string()) for chave in ORDEM_PARTICOES])
+    esquema = _unificar_esquemas(esquemas + [esquema_particoes])
+    dataset = ds.dataset(
+        [str(a) for a in arquivos],
+        schema=esquema,
+        format="parquet",
+        partitioning=ds.partitioning(esquema_particoes, flavor="hive"),
+        partition_base_dir=str(raiz),
+    )
+
+    if colunas is not None:
+        colunas = [c for c in metadados["indice"] if c not in colunas] + list(colunas)
+    expressao = pq.filters_to_expression(filtros) if filtros else None
+    with etapa("leitura_parquet"):
+        df = dataset.to_table(columns=colunas, filter=expressao).to_pandas()
+
+    return _restaurar_estrutura(df, metadados) if restaurar_estrutura else df
+
+
+def espelhar_csv(caminho_csv, fonte, liga, temporada, stat_type, raiz=PASTA_DATASET):
+    """Grava no dataset Parquet o conteúdo de um CSV já salvo pelos coletores."""
+    df = pd.read_csv(caminho_csv, encoding="utf-8-sig")
+    return salvar_dataset(df, fonte, liga, temporada, stat_type, raiz=raiz)
+
+
+def converter_football_data(pasta=Path(__file__).resolve().parent.parent / "dados_coletados_football_data_org", raiz=PASTA_DATASET):
+    """
+    Converte a árvore de CSVs da football-data.org
+    (<endpoint>/<competição>/<ano>/<tabela>_<competição>_<ano>.csv) para o dataset.
+    """
+    convertidos = 0
+    for caminho_csv in sorted(Path(pasta).glob("*/*/*/*.csv")):
+        competicao, ano = caminho_csv.parent.parent.name, caminho_csv.parent.name
+        stat_type = caminho_csv.stem.split(f"_{competicao}_")[0]
+        caminho, alterado = espelhar_csv(caminho_csv, "football_data", competicao, ano, stat_type, raiz=raiz)
+        print(f"{'Convertido' if alterado else 'Sem alterações'}: {caminho_csv} -> {caminho}")
+        convertidos += 1
+    return convertidos
+
+
+if __name__ == "__main__":
+    # Importado aqui: o conversor do FBref usa os coletores, que importam este módulo
+    from conversao_csv_fbref import converter_fbref
+
+    total = converter_football_data()
+    print(f"{total} arquivos CSV da football-data.org convertidos para {PASTA_DATASET}/")
+    alteradas = converter_fbref()
+    print(f"{alteradas} partições do FBref gravadas a partir dos CSVs em {PASTA_DATASET}/")
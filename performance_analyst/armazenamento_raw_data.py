@@ -0,0 +1,296 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+from soccerdata import FBref
+
+from telemetria import contar, etapa
+
+# Relativas a performance_analyst/, independente da pasta de onde o script é chamado
+PASTA_MODULO = Path(__file__).resolve().parent
+PASTA_RAW_DATA = PASTA_MODULO / "raw_data"
+PASTA_LOJA = PASTA_MODULO / "raw_data_store"
+
+# Tabelas que incluem uma temporada em andamento são relidas pelo soccerdata
+# (que decide se baixa de novo) depois deste intervalo
+TTL_TEMPORADA_ABERTA = timedelta(days=1)
+
+PADRAO_PAGINA_TEMPORADA = re.compile(r"^(?P<liga>.+)_(?P<temporada>\d{4})_(?P<pagina>.+)$")
+
+
+def interpretar_nome(nome_arquivo):
+    """
+    Extrai tipo, liga, temporada e página do nome de um arquivo do cache do
+    soccerdata, ex.: 'teams_ENG-Premier League_1617_stats.html'.
+    """
+    base = nome_arquivo[:-len(".html")] if nome_arquivo.endswith(".html") else nome_arquivo
+    tipo, _, resto = base.partition("_")
+    info = {"tipo": tipo, "liga": None, "temporada": None, "pagina": None}
+    encontrado = PADRAO_PAGINA_TEMPORADA.match(resto)
+    if encontrado:
+        info.update(encontrado.groupdict())
+    elif tipo == "match":
+        info["pagina"] = resto or None
+    else:
+        info["liga"] = resto or None
+    return info
+
+
+class LojaRawData:
+    """
+    Armazena as páginas HTML do FBref compactadas (gzip), endereçadas pelo
+    sha256 do conteúdo, com um índice JSON por nome de arquivo (liga,
+    temporada, tipo de página, horário da coleta e hash).
+    Também guarda, em Parquet, as tabelas já extraídas de cada leitura,
+    associadas aos hashes das páginas de que dependem: enquanto essas
+    páginas não mudarem, a leitura não precisa analisar o HTML de novo.
+    As páginas e o seu índice vão para o git; as tabelas, com índice
+    próprio em tabelas/, são cache local.
+    """
+
+    def __init__(self, pasta=PASTA_LOJA, trava=None):
+        self.pasta = Path(pasta)
+        # Trava compartilhada quando vários processos usam a mesma loja
+        self.trava = trava
+        self.pasta_paginas = self.pasta / "paginas"
+        self.pasta_tabelas = self.pasta / "tabelas"
+        self.caminho_indice = self.pasta / "indice.json"
+        self.caminho_indice_tabelas = self.pasta_tabelas / "indice.json"
+        self.pasta_paginas.mkdir(parents=True, exist_ok=True)
+        self.pasta_tabelas.mkdir(parents=True, exist_ok=True)
+        self.indice = self._carregar_indice()
+        self._materializado = set()
+
+    @staticmethod
+    def _ler_json(caminho):
+        if caminho.exists():
+            with open(caminho, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    @staticmethod
+    def _gravar_json(caminho, dados):
+        temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f, indent=2, ensure_ascii=False, sort_keys=True)
+        os.replace(temporario, caminho)
+
+    def _carregar_indice(self):
+        return {
+            "paginas": self._ler_json(self.caminho_indice),
+            "tabelas": self._ler_json(self.caminho_indice_tabelas),
+        }
+
+    def _salvar_indice(self):
+        """
+        Grava o índice de forma atômica. Com uma trava compartilhada, as
+        entradas gravadas por outros processos são mescladas antes, para
+        que nenhuma se perca.
+        """
+        with self.trava or nullcontext():
+            if self.trava is not None:
+                em_disco = self._carregar_indice()
+                for secao in ("paginas", "tabelas"):
+                    self.indice[secao] = {**em_disco[secao], **self.indice[secao]}
+            self._gravar_json(self.caminho_indice, self.indice["paginas"])
+            self._gravar_json(self.caminho_indice_tabelas, self.indice["tabelas"])
+
+    def _caminho_pagina(self, hash_pagina):
+        return self.pasta_paginas / f"{hash_pagina}.html.gz"
+
+    # Páginas HTML
+
+    def importar(self, caminho_html, salvar_indice=True):
+        """Compacta uma página HTML para a loja e devolve (nome, hash)."""
+        caminho_html = Path(caminho_html)
+        conteudo = caminho_html.read_bytes()
+        hash_pagina = hashlib.sha256(conteudo).hexdigest()
+        destino = self._caminho_pagina(hash_pagina)
+        if not destino.exists():
+            temporario = destino.with_suffix(f".{os.getpid()}.tmp")
+            # mtime=0: o mesmo HTML gera sempre o mesmo .gz
+            temporario.write_bytes(gzip.compress(conteudo, compresslevel=9, mtime=0))
+            os.replace(temporario, destino)
+
+        coletado_em = datetime.fromtimestamp(caminho_html.stat().st_mtime, tz=timezone.utc)
+        entrada = interpretar_nome(caminho_html.name)
+        entrada.update({
+            "fetched_at": coletado_em.isoformat(timespec="seconds"),
+            "hash": hash_pagina,
+            "bytes": len(conteudo),
+            "bytes_compactados": destino.stat().st_size,
+        })
+        self.indice["paginas"][caminho_html.name] = entrada
+        if salvar_indice:
+            self._salvar_indice()
+        return caminho_html.name, hash_pagina
+
+    def importar_pasta(self, pasta=PASTA_RAW_DATA, remover_originais=False):
+        """Importa todas as páginas .html de uma pasta (ex.: raw_data/)."""
+        importadas = []
+        for caminho_html in sorted(Path(pasta).glob("*.html")):
+            importadas.append(self.importar(caminho_html, salvar_indice=False))
+            if remover_originais:
+                caminho_html.unlink()
+        self._salvar_indice()
+        return importadas
+
+    def ler_pagina(self, nome):
+        """Conteúdo descompactado da página registrada com esse nome de arquivo."""
+        entrada = self.indice["paginas"][nome]
+        return gzip.decompress(self._caminho_pagina(entrada["hash"]).read_bytes())
+
+    def materializar(self, data_dir):
+        """
+        Grava no data_dir do soccerdata as páginas da loja que não estão lá,
+        com a data de modificação original, para que nada seja baixado de novo.
+        """
+        data_dir = Path(data_dir)
+        if data_dir in self._materializado:
+            return
+        data_dir.mkdir(parents=True, exist_ok=True)
+        for nome, entrada in self.indice["paginas"].items():
+            destino = data_dir / nome
+            if not destino.exists():
+                temporario = destino.with_suffix(f".{os.getpid()}.tmp")
+                temporario.write_bytes(self.ler_pagina(nome))
+                coletado_em = datetime.fromisoformat(entrada["fetched_at"]).timestamp()
+                os.utime(temporario, (coletado_em, coletado_em))
+                os.replace(temporario, destino)
+        self._materializado.add(data_dir)
+
+    # Tabelas extraídas
+
+    @staticmethod
+    def chave_leitura(ligas, temporadas, leitor, kwargs):
+        return json.dumps(
+            {"ligas": sorted(ligas), "temporadas": sorted(temporadas), "leitor": leitor, "kwargs": kwargs},
+            sort_keys=True,
+        )
+
+    def _dependencias_validas(self, dependencias, data_dir):
+        for nome, hash_pagina in dependencias.items():
+            entrada = self.indice["paginas"].get(nome)
+            if entrada is None:
+                return False
+            # Página baixada de novo pelo soccerdata depois da importação
+            caminho_local = Path(data_dir) / nome
+            if caminho_local.exists():
+                coletado_em = datetime.fromisoformat(entrada["fetched_at"]).timestamp()
+                if caminho_local.stat().st_mtime > coletado_em + 1:
+                    self.importar(caminho_local)
+                    entrada = self.indice["paginas"][nome]
+            if entrada["hash"] != hash_pagina:
+                return False
+        return True
+
+    def obter_tabela(self, chave, data_dir, validade=None):
+        """
+        Tabela cacheada para a leitura, ou None se alguma página mudou ou se
+        a tabela é mais antiga que `validade` (timedelta; None = sem prazo).
+        """
+        receita = self.indice["tabelas"].get(chave)
+        if receita is None:
+            return None
+        if validade is not None:
+            armazenado_em = receita.get("armazenado_em")
+            if armazenado_em is None or datetime.now(timezone.utc) - datetime.fromisoformat(armazenado_em) > validade:
+                contar("fbref_cache_vencidas")
+                return None
+        if not self._dependencias_validas(receita["dependencias"], data_dir):
+            return None
+        caminho = self.pasta / receita["arquivo"]
+        if not caminho.exists():
+            return None
+        return pd.read_parquet(caminho)
+
+    def salvar_tabela(self, chave, dependencias, df):
+        """Grava a tabela em Parquet, nomeada pelo hash da leitura e das páginas usadas."""
+        assinatura = json.dumps([chave, sorted(dependencias.items())])
+        nome_arquivo = f"{hashlib.sha256(assinatura.encode('utf-8')).hexdigest()}.parquet"
+        df.to_parquet(self.pasta_tabelas / nome_arquivo)
+        self.indice["tabelas"][chave] = {
+            "dependencias": dependencias,
+            "arquivo": f"tabelas/{nome_arquivo}",
+            "armazenado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        self._salvar_indice()
+
+
+class FBrefRegistrado(FBref):
+    """
+    FBref que anota em `paginas_lidas` cada arquivo de página que uma
+    leitura usa, baixado ou não, para que ler_com_cache saiba de quais
+    páginas a tabela extraída depende.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.paginas_lidas = []
+        super().__init__(*args, **kwargs)
+
+    def get(self, url, filepath=None, *args, **kwargs):
+        if filepath is not None:
+            self.paginas_lidas.append(Path(filepath))
+        return super().get(url, filepath, *args, **kwargs)
+
+    @classmethod
+    def _all_leagues(cls):
+        # O soccerdata procura as ligas pelo nome da classe; as subclasses usam as do FBref
+        return FBref._all_leagues()
+
+    def temporadas_encerradas(self):
+        """Se todas as (liga, temporada) da leitura já terminaram, pelo critério do próprio soccerdata."""
+        try:
+            return all(self._is_complete(liga, temporada) for liga in self.leagues for temporada in self.seasons)
+        except (ValueError, KeyError):
+            return False
+
+
+def ler_com_cache(fbref, leitor, loja=None, **kwargs):
+    """
+    Executa `fbref.<leitor>(**kwargs)` usando a loja: se as páginas de que a
+    leitura depende não mudaram, devolve a tabela já extraída sem analisar
+    HTML. Caso contrário, executa a leitura, registra as páginas acessadas
+    e guarda a tabela resultante. Leituras com uma temporada em andamento
+    só usam a tabela cacheada por TTL_TEMPORADA_ABERTA; depois disso passam
+    pelo soccerdata, que atualiza as páginas da temporada.
+    `fbref` precisa ser um FBrefRegistrado (ou subclasse).
+    """
+    if not isinstance(fbref, FBrefRegistrado):
+        raise TypeError("ler_com_cache precisa de um FBrefRegistrado para saber quais páginas a leitura usa")
+    loja = loja or LojaRawData()
+    chave = loja.chave_leitura(fbref.leagues, fbref.seasons, leitor, kwargs)
+    validade = None if fbref.temporadas_encerradas() else TTL_TEMPORADA_ABERTA
+    with etapa("fbref_tabela_cacheada"):
+        df = loja.obter_tabela(chave, fbref.data_dir, validade)
+    if df is not None:
+        contar("fbref_cache_acertos")
+        return df
+    contar("fbref_cache_faltas")
+
+    loja.materializar(fbref.data_dir)
+    inicio = len(fbref.paginas_lidas)
+    with etapa(f"fbref_{leitor}"):
+        df = getattr(fbref, leitor)(**kwargs)
+    paginas_lidas = fbref.paginas_lidas[inicio:]
+
+    dependencias = dict(loja.importar(p, salvar_indice=False) for p in paginas_lidas if p.exists())
+    loja.salvar_tabela(chave, dependencias, df)
+    return df
+
+
+if __name__ == "__main__":
+    loja = LojaRawData()
+    # As páginas soltas passam a existir só na loja
+    importadas = loja.importar_pasta(PASTA_RAW_DATA, remover_originais=True)
+    paginas = loja.indice["paginas"].values()
+    total = sum(e["bytes"] for e in paginas)
+    unicos = {e["hash"]: e["bytes_compactados"] for e in paginas}
+    print(f"{len(importadas)} páginas importadas de {PASTA_RAW_DATA}/ para {PASTA_LOJA}/")
+    print(f"Tamanho original: {total / 1e6:.1f} MB | compactado: {sum(unicos.values()) / 1e6:.1f} MB")
@@ -0,0 +1,147 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from datetime import date, timedelta
+
+from manifesto_coleta import DIAS_CARENCIA_ENCERRAMENTO
+
+# Na raiz do repositório, independente da pasta de onde o coletor é chamado
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_CACHE_PADRAO = os.getenv("FD_CACHE_DIR", os.path.join(RAIZ_REPO, ".cache_football_data"))
+TAMANHO_MAXIMO_PADRAO = int(os.getenv("FD_CACHE_MAX_MB", "512")) * 1024 * 1024
+MODO_OFFLINE_PADRAO = os.getenv("FD_MODO_OFFLINE", "").lower() in ("1", "true", "sim")
+
+# TTLs por classe de endpoint, em segundos (None = nunca expira)
+TTL_COMPETICOES = 24 * 3600
+TTL_TEMPORADA_ATUAL = 3600
+TTL_PADRAO = 24 * 3600
+
+
+class RespostaNaoCacheada(Exception):
+    """Levantada no modo offline quando a requisição não está no cache."""
+
+
+def chave_requisicao(url, params=None, headers=None):
+    """
+    Hash da requisição: URL, parâmetros ordenados e apenas os cabeçalhos
+    X-Unfold, que mudam o conteúdo da resposta (o token não entra na chave).
+    """
+    unfold = {k: v for k, v in (headers or {}).items() if k.lower().startswith("x-unfold")}
+    normalizado = json.dumps(
+        {"url": url, "params": {k: str(v) for k, v in (params or {}).items()}, "headers": unfold},
+        sort_keys=True,
+    )
+    return hashlib.sha256(normalizado.encode("utf-8")).hexdigest()
+
+
+def _fim_temporada(dados):
+    """Data de término da temporada contida na resposta, se houver."""
+    season = dados.get("season") or {}
+    if not season.get("endDate") and dados.get("matches"):
+        season = dados["matches"][0].get("season") or {}
+    fim = season.get("endDate")
+    return date.fromisoformat(fim) if fim else None
+
+
+def calcular_ttl(endpoint_path, dados):
+    """
+    Partidas e artilheiros de temporadas encerradas nunca expiram; os da
+    temporada em andamento expiram rápido. Listas de competições valem um dia.
+    """
+    if re.search(r"/(matches|scorers)$", endpoint_path):
+        fim = _fim_temporada(dados) if isinstance(dados, dict) else None
+        if fim and fim + timedelta(days=DIAS_CARENCIA_ENCERRAMENTO) < date.today():
+            return None
+        return TTL_TEMPORADA_ATUAL
+    if endpoint_path.startswith("/competitions"):
+        return TTL_COMPETICOES
+    return TTL_PADRAO
+
+
+class CacheRespostas:
+    """
+    Cache em disco das respostas JSON da football-data.org.
+    Cada entrada é um arquivo <hash da requisição>.json com os dados e o
+    horário de expiração. Quando o tamanho total passa do limite, as
+    entradas menos usadas recentemente são removidas. No modo offline o
+    cache é a única fonte: entradas vencidas continuam valendo e uma
+    ausência levanta RespostaNaoCacheada.
+    """
+
+    def __init__(self, pasta=PASTA_CACHE_PADRAO, tamanho_maximo=TAMANHO_MAXIMO_PADRAO, offline=MODO_OFFLINE_PADRAO):
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._tamanho_atual = None
+        os.makedirs(self.pasta, exist_ok=True)
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, f"{chave}.json")
+
+    def obter(self, url, params=None, headers=None):
+        """Devolve os dados cacheados ou None se ausentes/expirados."""
+        caminho = self._caminho(chave_requisicao(url, params, headers))
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                entrada = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        expira_em = entrada.get("expira_em")
+        if not self.offline and expira_em is not None and expira_em < time.time():
+            return None
+        try:
+            os.utime(caminho)  # marca o uso para a política LRU
+        except OSError:
+            # Despejada por outra thread entre a leitura e agora: conta como ausente
+            return None
+        return entrada["dados"]
+
+    def armazenar(self, url, endpoint_path, dados, params=None, headers=None):
+        ttl = calcular_ttl(endpoint_path, dados)
+        entrada = {
+            "url": url,
+            "params": params,
+            "headers": {k: v for k, v in (headers or {}).items() if k.lower().startswith("x-unfold")},
+            "armazenado_em": time.time(),
+            "expira_em": None if ttl is None else time.time() + ttl,
+            "dados": dados,
+        }
+        conteudo = json.dumps(entrada, ensure_ascii=False).encode("utf-8")
+        caminho = self._caminho(chave_requisicao(url, params, headers))
+
+        with self._lock:
+            tamanho_total = self._tamanho_total()
+            tamanho_anterior = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+            temporario = f"{caminho}.tmp"
+            with open(temporario, "wb") as f:
+                f.write(conteudo)
+            os.replace(temporario, caminho)
+            self._tamanho_atual = tamanho_total + len(conteudo) - tamanho_anterior
+            if self._tamanho_atual > self.tamanho_maximo:
+                self._despejar()
+
+    def _tamanho_total(self):
+        if self._tamanho_atual is None:
+            self._tamanho_atual = sum(e.stat().st_size for e in os.scandir(self.pasta) if e.name.endswith(".json"))
+        return self._tamanho_atual
+
+    def _despejar(self):
+        """Remove as entradas usadas há mais tempo até caber no limite."""
+        entradas = sorted(
+            (e for e in os.scandir(self.pasta) if e.name.endswith(".json")),
+            key=lambda e: e.stat().st_mtime,
+        )
+        for e in entradas:
+            if self._tamanho_atual <= self.tamanho_maximo:
+                break
+            try:
+                tamanho = e.stat().st_size
+                os.remove(e.path)
+            except FileNotFoundError:
+                continue
+            self._tamanho_atual -= tamanho
@@ -0,0 +1,214 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from cache_respostas import CacheRespostas, RespostaNaoCacheada
+from telemetria import contar, etapa
+
+# Carrega as variáveis do arquivo .env para o ambiente
+load_dotenv()
+
+# Configurações da API football-data.org
+BASE_URL_FD = "https://api.football-data.org/v4"
+FD_AUTH_TOKEN = os.getenv("FOOTBALL_DATA_TOKEN")
+
+# Plano gratuito: 10 requisições por minuto
+REQUISICOES_POR_MINUTO = 10
+
+HEADERS_UNFOLD = {
+    "X-Unfold-Lineups": "true",
+    "X-Unfold-Bookings": "true",
+    "X-Unfold-Subs": "true",
+    "X-Unfold-Goals": "true"
+}
+
+
+class LimitadorTokenBucket:
+    """
+    Token bucket compartilhado entre threads.
+    A capacidade e a taxa de reposição seguem a cota da API, e o estado é
+    corrigido pelos cabeçalhos X-Requests-Available-Minute e
+    X-RequestCounter-Reset devolvidos a cada resposta.
+    """
+
+    def __init__(self, capacidade=REQUISICOES_POR_MINUTO, periodo_segundos=60):
+        self.capacidade = capacidade
+        self.taxa_reposicao = capacidade / periodo_segundos
+        self.tokens = float(capacidade)
+        self.ultima_atualizacao = time.monotonic()
+        self.bloqueado_ate = 0.0
+        self._lock = threading.RLock()
+
+    def _repor(self, agora):
+        decorrido = agora - self.ultima_atualizacao
+        self.tokens = min(self.capacidade, self.tokens + decorrido * self.taxa_reposicao)
+        self.ultima_atualizacao = agora
+
+    def adquirir(self):
+        """Bloqueia até haver um token disponível e o consome."""
+        with etapa("fd_espera_cota"):
+            while True:
+                with self._lock:
+                    agora = time.monotonic()
+                    self._repor(agora)
+                    if agora >= self.bloqueado_ate and self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    espera = max(self.bloqueado_ate - agora, (1 - self.tokens) / self.taxa_reposicao)
+                time.sleep(espera)
+
+    def sincronizar(self, headers):
+        """Ajusta o bucket ao saldo informado pela API."""
+        disponiveis = headers.get("X-Requests-Available-Minute")
+        reset = headers.get("X-RequestCounter-Reset")
+        with self._lock:
+            self._repor(time.monotonic())
+            if disponiveis is not None and disponiveis.isdigit():
+                self.tokens = min(self.tokens, float(disponiveis))
+                if int(disponiveis) == 0 and reset is not None and reset.isdigit():
+                    self.bloquear(int(reset))
+
+    def bloquear(self, segundos):
+        """Suspende a emissão de tokens pelos próximos `segundos` (ex.: após um 429)."""
+        with self._lock:
+            self.bloqueado_ate = max(self.bloqueado_ate, time.monotonic() + segundos)
+            self.tokens = 0.0
+
+
+class ClienteFootballData:
+    """
+    Cliente único para a API football-data.org.
+    Usa uma sessão com pool de conexões e um limitador de taxa compartilhado,
+    de modo que requisições em paralelo nunca ultrapassem a cota por minuto.
+    As respostas passam pelo cache em disco; use cache=False para desativá-lo.
+    """
+
+    def __init__(self, token=FD_AUTH_TOKEN, limitador=None, tamanho_pool=REQUISICOES_POR_MINUTO, cache=None):
+        self.limitador = limitador or LimitadorTokenBucket()
+        self.cache = CacheRespostas() if cache is None else cache
+        self.sessao = requests.Session()
+        self.sessao.headers.update({"X-Auth-Token": token or ""})
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamanho_pool)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.mount("http://", adaptador)
+
+    def obter_resposta(self, endpoint_path, params=None, extra_headers=None, timeout=30):
+        """
+        Faz um único GET respeitando a cota e devolve a resposta crua.
+        Exceções do requests são propagadas para quem chamou.
+        """
+        self.limitador.adquirir()
+        with etapa("fd_requisicao"):
+            response = self.sessao.get(f"{BASE_URL_FD}{endpoint_path}", headers=extra_headers, params=params, timeout=timeout)
+        contar("fd_requisicoes")
+        contar("fd_bytes", len(response.content))
+        self.limitador.sincronizar(response.headers)
+        response.raise_for_status()
+        return response
+
+    def obter_json(self, endpoint_path, params=None, extra_headers=None, timeout=30):
+        """
+        Devolve o JSON do endpoint, consultando o cache antes da API.
+        No modo offline, uma requisição fora do cache levanta RespostaNaoCacheada.
+        """
+        url_completa = f"{BASE_URL_FD}{endpoint_path}"
+        if self.cache:
+            dados = self.cache.obter(url_completa, params, extra_headers)
+            if dados is not None:
+                contar("fd_cache_acertos")
+                return dados
+            contar("fd_cache_faltas")
+            if self.cache.offline:
+                raise RespostaNaoCacheada(f"{url_completa} com params {params} não está no cache (modo offline).")
+
+        response = self.obter_resposta(endpoint_path, params, extra_headers, timeout)
+        with etapa("fd_decodificacao_json"):
+            dados = response.json()
+        if self.cache:
+            self.cache.armazenar(url_completa, endpoint_path, dados, params, extra_headers)
+        return dados
+
+    def requisitar(self, endpoint_path, params=None, extra_headers=None, max_retries=3, timeout=30):
+        """
+        Faz um GET no endpoint respeitando a cota da API.
+        Retorna o JSON da resposta ou None em caso de falha.
+        """
+        url_completa = f"{BASE_URL_FD}{endpoint_path}"
+        print(f"Requisitando: {url_completa} com params: {params}")
+
+        for attempt in range(max_retries):
+            if attempt:
+                contar("fd_novas_tentativas")
+            try:
+                return self.obter_json(endpoint_path, params, extra_headers, timeout)
+            except RespostaNaoCacheada as e:
+                print(f"Erro: {e}")
+                return None
+            except requests.exceptions.HTTPError as e:
+                contar(f"fd_http_{e.response.status_code}")
+                if e.response.status_code == 429:
+                    reset = e.response.headers.get("X-RequestCounter-Reset", "")
+                    delay = int(reset) if reset.isdigit() else 60
+                    print(f"Erro 429 (Too Many Requests). Aguardando {delay}s antes de tentar novamente...")
+                    self.limitador.bloquear(delay)
+                elif e.response.status_code in [403, 404]:
+                    print(f"Erro HTTP {e.response.status_code} para {url_completa}: {e.response.text[:200]}")
+                    return None
+                else:
+                    print(f"Erro HTTP para {url_completa}: {e.response.status_code} - {e.response.text[:200]}")
+                    if attempt + 1 == max_retries: return None
+            except requests.exceptions.Timeout:
+                contar("fd_timeouts")
+                print(f"Erro: Timeout. Tentativa {attempt + 1}/{max_retries}")
+                if attempt + 1 == max_retries: return None
+            except requests.exceptions.RequestException as e:
+                print(f"Erro na requisição para {url_completa}: {e}")
+                return None
+            except ValueError as e:
+                print(f"Erro ao decodificar JSON de {url_completa}: {e}")
+                return None
+        return None
+
+    def requisitar_em_paralelo(self, requisicoes, max_concorrencia=REQUISICOES_POR_MINUTO):
+        """
+        Dispara várias requisições em threads e devolve (requisicao, dados)
+        conforme cada uma termina. Cada requisição é um dicionário com as
+        chaves de `requisitar` (endpoint_path, params, extra_headers) e
+        pode carregar chaves extras de contexto, que são ignoradas aqui.
+        O limitador garante que o total continue dentro da cota.
+        """
+        with ThreadPoolExecutor(max_workers=max_concorrencia) as executor:
+            futuros = {
+                executor.submit(
+                    self.requisitar,
+                    req["endpoint_path"],
+                    params=req.get("params"),
+                    extra_headers=req.get("extra_headers"),
+                ): req
+                for req in requisicoes
+            }
+            for futuro in as_completed(futuros):
+                yield futuros[futuro], futuro.result()
+
+    async def requisitar_async(self, endpoint_path, params=None, extra_headers=None):
+        """Versão assíncrona de `requisitar`, executada em uma thread do loop."""
+        return await asyncio.to_thread(self.requisitar, endpoint_path, params, extra_headers)
+
+    async def requisitar_varios_async(self, requisicoes, max_concorrencia=REQUISICOES_POR_MINUTO):
+        """Executa as requisições com asyncio e devolve os resultados na mesma ordem."""
+        semaforo = asyncio.Semaphore(max_concorrencia)
+
+        async def executar(req):
+            async with semaforo:
+                return await self.requisitar_async(req["endpoint_path"], req.get("params"), req.get("extra_headers"))
+
+        return await asyncio.gather(*(executar(req) for req in requisicoes))
+
+    def fechar(self):
+        self.sessao.close()
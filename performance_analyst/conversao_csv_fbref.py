@@ -0,0 +1,149 @@
+import re
+import csv
+from pathlib import Path
+
+import pandas as pd
+from lxml import html
+
+from armazenamento_parquet import PASTA_DATASET, salvar_dataset
+from armazenamento_raw_data import LojaRawData
+from manifesto_coleta import hash_arquivo
+from esquemas_fbref import tipar_fbref
+from estatisticas_jogadores import LIGA_BIG_5, codigo_temporada, dividir_por_liga, ligas_do_indice
+from estatisticas_por_jogo import FONTE as FONTE_PADRAO_TRADUZIDO, STAT_TYPE as STAT_TYPE_PADRAO_TRADUZIDO
+from estatisticas_time import estatisticas as ESTATISTICAS_TIMES
+
+# CSVs gravados pelos coletores antes do dataset Parquet (to_csv com index=False)
+PASTA_MODULO = Path(__file__).resolve().parent
+PASTA_JOGADORES = PASTA_MODULO / LIGA_BIG_5           # <temporada>/<stat_type>.csv
+PASTA_TIMES = PASTA_MODULO / "dados_times"            # <liga>/<temporada>/<nome>.csv
+PASTA_LIGAS = PASTA_MODULO / "dados_ligas"            # <liga>/<temporada>.csv
+
+INDICE_TIMES = ["league", "season", "team"]
+
+# Nome do arquivo de times -> stat_type do soccerdata. A partição usa o nome
+# de estatisticas_time.py; os nomes antigos repetidos em algumas temporadas
+# caem na mesma partição
+STAT_TYPE_POR_ARQUIVO = {nome: stat_type for stat_type, nome in ESTATISTICAS_TIMES.items()}
+STAT_TYPE_POR_ARQUIVO.update({
+    "finalizacoes": "shooting",
+    "goleiros": "keeper",
+    "goleiros_avancado": "keeper_adv",
+    "tipos_de_passe": "passing_types",
+    "criacao_de_jogadas": "goal_shot_creation",
+})
+
+PADRAO_ID_TIME = re.compile(r"/squads/(?P<id>[0-9a-f]+)/")
+
+
+def ler_csv_fbref(caminho):
+    """
+    Lê um CSV do FBref reconstruindo o cabeçalho de dois níveis quando a
+    primeira linha repete grupos ('Total', 'Total', ...): ('Total', 'Cmp'),
+    e ('nation', '') nas colunas de um nível só, como o soccerdata devolve.
+    """
+    with open(caminho, encoding="utf-8-sig", newline="") as f:
+        nomes = next(csv.reader(f))
+    if len(nomes) == len(set(nomes)):
+        return pd.read_csv(caminho, encoding="utf-8-sig")
+    df = pd.read_csv(caminho, header=[0, 1], encoding="utf-8-sig")
+    df.columns = pd.MultiIndex.from_tuples([
+        (topo, "" if sub.startswith("Unnamed") else sub) for topo, sub in df.columns
+    ])
+    return df
+
+
+def times_por_id(liga, temporada, loja):
+    """
+    id do FBref -> (liga real, nome do time), tirados das páginas de
+    estatísticas de cada liga guardadas na loja de raw_data.
+    """
+    times = {}
+    for liga_real in sorted(ligas_do_indice(liga)):
+        nome = f"teams_{liga_real}_{codigo_temporada(temporada)}_stats.html"
+        if nome not in loja.indice["paginas"]:
+            continue
+        arvore = html.fromstring(loja.ler_pagina(nome))
+        for link in arvore.xpath("//table[@id='stats_squads_standard_for']//*[@data-stat='team']/a"):
+            times[PADRAO_ID_TIME.search(link.get("href")).group("id")] = (liga_real, link.text)
+    return times
+
+
+def indexar_por_time(df, temporada, times):
+    """
+    Reconstrói o índice (league, season, team) que o to_csv descartou, a
+    partir da coluna de URL do time e do resultado de times_por_id.
+    Falha se algum time não for encontrado.
+    """
+    (coluna_url,) = [c for c in df.columns if (c[0] if isinstance(c, tuple) else c).lower() == "url"]
+    ids = df[coluna_url].str.extract(PADRAO_ID_TIME, expand=False)
+    faltantes = sorted(set(ids) - set(times), key=str)
+    if faltantes:
+        raise ValueError(f"Times sem página na loja para {temporada}: {', '.join(map(str, faltantes))}")
+    ligas, nomes = zip(*(times[i] for i in ids))
+    df = df.copy()
+    df.index = pd.MultiIndex.from_arrays([ligas, [codigo_temporada(temporada)] * len(df), nomes], names=INDICE_TIMES)
+    return df
+
+
+def _salvar_por_liga(df, fonte, liga, temporada, stat_type, raiz):
+    return [
+        salvar_dataset(df_liga, fonte, liga_linha, temporada, stat_type, raiz=raiz)
+        for liga_linha, df_liga in dividir_por_liga(df, liga)
+    ]
+
+
+def converter_times(pasta=PASTA_TIMES, raiz=PASTA_DATASET, loja=None):
+    """dados_times/<liga>/<temporada>/<nome>.csv -> fonte=fbref_times, uma partição por liga real."""
+    loja = loja or LojaRawData()
+    salvos = []
+    for pasta_temporada in sorted(Path(pasta).glob("*/*/")):
+        liga, temporada = pasta_temporada.parent.name, pasta_temporada.name
+        times = times_por_id(liga, temporada, loja)
+        for caminho_csv in sorted(pasta_temporada.glob("*.csv")):
+            stat_type = STAT_TYPE_POR_ARQUIVO[caminho_csv.stem]
+            df = tipar_fbref(indexar_por_time(ler_csv_fbref(caminho_csv), temporada, times), stat_type)
+            salvos += _salvar_por_liga(df, "fbref_times", liga, temporada, ESTATISTICAS_TIMES[stat_type], raiz)
+    return salvos
+
+
+def converter_ligas(pasta=PASTA_LIGAS, raiz=PASTA_DATASET, loja=None):
+    """dados_ligas/<liga>/<temporada>.csv (colunas já traduzidas) -> a partição de estatisticas_por_jogo.py."""
+    loja = loja or LojaRawData()
+    salvos = []
+    for caminho_csv in sorted(Path(pasta).glob("*/*.csv")):
+        liga, temporada = caminho_csv.parent.name, caminho_csv.stem
+        df = indexar_por_time(ler_csv_fbref(caminho_csv), temporada, times_por_id(liga, temporada, loja))
+        salvos += _salvar_por_liga(df, FONTE_PADRAO_TRADUZIDO, liga, temporada, STAT_TYPE_PADRAO_TRADUZIDO, raiz)
+    return salvos
+
+
+def converter_jogadores(pasta=PASTA_JOGADORES, raiz=PASTA_DATASET):
+    """
+    <liga>/<temporada>/<stat_type>.csv -> fonte=fbref_jogadores.
+    Esses CSVs não têm jogador, time nem temporada (o índice foi
+    descartado) e cada pasta de temporada guarda a mesma tabela com todas
+    as temporadas lidas de uma vez. Por isso ficam numa única partição por
+    stat_type, em liga=<liga combinada> e temporada=<primeira>_<última>,
+    só com o cabeçalho de dois níveis reconstruído; cada conteúdo distinto
+    vira uma parte nomeada pelo seu hash, então as cópias não se repetem.
+    """
+    pasta = Path(pasta)
+    temporadas = sorted(p.name for p in pasta.iterdir() if p.is_dir())
+    if not temporadas:
+        return []
+    intervalo = f"{temporadas[0]}_{temporadas[-1]}"
+    salvos = []
+    for caminho_csv in sorted(pasta.glob("*/*.csv")):
+        stat_type = caminho_csv.stem
+        df = tipar_fbref(ler_csv_fbref(caminho_csv), stat_type)
+        salvos.append(salvar_dataset(df, "fbref_jogadores", pasta.name, intervalo, stat_type, raiz=raiz,
+                                     nome_parte=f"csv-{hash_arquivo(caminho_csv)[:12]}"))
+    return salvos
+
+
+def converter_fbref(raiz=PASTA_DATASET):
+    """Converte todos os CSVs do FBref versionados para o dataset. Devolve quantas partições mudaram."""
+    loja = LojaRawData()
+    salvos = converter_times(raiz=raiz, loja=loja) + converter_ligas(raiz=raiz, loja=loja) + converter_jogadores(raiz=raiz)
+    return sum(alterado for _, alterado in salvos)
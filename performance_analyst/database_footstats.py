@@ -1,76 +1,45 @@
-import os
-import requests
-import pandas as pd
 import json
-from dotenv import load_dotenv
+from cliente_football_data import ClienteFootballData, BASE_URL_FD, FD_AUTH_TOKEN, HEADERS_UNFOLD
+from cache_respostas import MODO_OFFLINE_PADRAO
+from esquemas_football_data import InferenciaEsquema, RegistroEsquemas, chave_endpoint, registros_da_resposta
 
-# Carrega as variáveis do arquivo .env para o ambiente
-load_dotenv()
-
-# --- Configurações da API football-data.org ---
-BASE_URL_FD = "https://api.football-data.org/v4"
-FD_AUTH_TOKEN = os.getenv("FOOTBALL_DATA_TOKEN")
-
-if not FD_AUTH_TOKEN:
+if not FD_AUTH_TOKEN and not MODO_OFFLINE_PADRAO:
     print("ERRO CRÍTICO: Token FD_AUTH_TOKEN não encontrado no .env ou nas variáveis de ambiente.")
     print("Por favor, configure o token para continuar.")
     exit()
 
-HEADERS_FD_BASE = {
-    "X-Auth-Token": FD_AUTH_TOKEN
-}
+cliente_fd = ClienteFootballData()
+registro_esquemas = RegistroEsquemas()
 
 # --- Função para Extrair Colunas do JSON (adaptada para football-data.org) ---
-def extrair_colunas_fd_json(json_data, endpoint_path_hint=""):
+def extrair_colunas_fd_json(json_data, endpoint_path_hint="", inferencia=None):
     """
     Extrai colunas de uma resposta JSON da football-data.org.
-    Tenta identificar a lista principal de dados ou usa o objeto diretamente.
+    Percorre todos os itens da lista principal (ou o objeto, para endpoints
+    de item único) e devolve a união das colunas, incluindo campos opcionais
+    que não aparecem no primeiro item. A inferência pode ser passada para
+    reaproveitar os tipos observados.
     """
     if not json_data:
         return "Resposta JSON vazia ou nula."
+    if not isinstance(json_data, (dict, list)):
+        return f"Formato de JSON não esperado: {type(json_data)}"
 
-    data_para_normalizar = None
-    # Chaves comuns que contêm listas de itens na API football-data.org
-    list_keys = ['competitions', 'matches', 'standings', 'scorers', 'squad', 'referees', 'bookings', 'goals', 'substitutions', 'seasons', 'teams', 'persons'] # Adicione outras conforme identificar
-
-    # Se a resposta for um dicionário, procuramos por uma chave que contenha uma lista
-    if isinstance(json_data, dict):
-        found_list = False
-        for key in list_keys:
-            if key in json_data and isinstance(json_data[key], list) and len(json_data[key]) > 0:
-                data_para_normalizar = json_data[key][0] # Pega o primeiro item da lista como amostra
-                print(f"  (Analisando o primeiro item da lista encontrada em '{key}')")
-                found_list = True
-                break
-        if not found_list:
-            # Se não encontrou uma lista conhecida, ou a lista está vazia, ou é um objeto único
-            data_para_normalizar = json_data # Trata o JSON inteiro como um único objeto/amostra
-            if any(key in json_data for key in list_keys if isinstance(json_data.get(key), list) and not json_data[key]):
-                 print("  (Uma chave de lista conhecida foi encontrada, mas estava vazia. Analisando o objeto principal.)")
-            else:
-                 print("  (Analisando o objeto JSON principal diretamente - esperado para endpoints de item único)")
-                
-    # Se a resposta já for uma lista (menos comum como resposta raiz nesta API, mas possível)
+    chave_lista, registros = registros_da_resposta(json_data)
+    if not registros:
+        return "Resposta é uma lista JSON vazia."
+    if chave_lista:
+        print(f"  (Analisando os {len(registros)} itens da lista encontrada em '{chave_lista}')")
     elif isinstance(json_data, list):
-        if len(json_data) > 0:
-            data_para_normalizar = json_data[0]
-            print("  (Analisando o primeiro item da lista JSON principal)")
-        else:
-            return "Resposta é uma lista JSON vazia."
+        print(f"  (Analisando os {len(registros)} itens da lista JSON principal)")
     else:
-        return f"Formato de JSON não esperado: {type(json_data)}"
+        print("  (Analisando o objeto JSON principal diretamente - esperado para endpoints de item único)")
 
-    if data_para_normalizar is not None:
-        try:
-            df_normalizado = pd.json_normalize(data_para_normalizar, sep='.') # Usando '.' como separador
-            return sorted(df_normalizado.columns.tolist())
-        except Exception as e:
-            # Fallback para chaves do primeiro nível se a normalização profunda falhar
-            if isinstance(data_para_normalizar, dict):
-                return f"Erro ao normalizar com Pandas: {e}. Chaves do primeiro nível: {sorted(list(data_para_normalizar.keys()))}"
-            return f"Erro ao normalizar com Pandas: {e}, e o dado não é um dicionário para fallback."
-    
-    return "Não foi possível extrair colunas (amostra de dados estava vazia, nula ou em formato não processável)."
+    inferencia = inferencia or InferenciaEsquema()
+    inferencia.observar(registros)
+    if not inferencia.registros:
+        return "Não foi possível extrair colunas (itens da lista não são objetos JSON)."
+    return sorted(inferencia.colunas)
 
 # --- Função para Chamar Endpoint e Mapear ---
 def mapear_endpoint_fd(nome_descritivo, path_template, path_params=None, query_params=None, extra_headers=None):
@@ -90,16 +59,15 @@ def mapear_endpoint_fd(nome_descritivo, path_template, path_params=None, query_p
     print(f"Path Formatado: {endpoint_path}")
     url_completa = f"{BASE_URL_FD}{endpoint_path}"
     
-    current_headers = HEADERS_FD_BASE.copy()
-    if extra_headers:
-        current_headers.update(extra_headers)
-
     try:
-        response = requests.get(url_completa, headers=current_headers, params=query_params, timeout=20)
-        response.raise_for_status()
-        
-        json_response = response.json()
-        colunas = extrair_colunas_fd_json(json_response, endpoint_path_hint=endpoint_path)
+        # requisitar trata o 429 (espera o reset) e as novas tentativas; devolve None se falhar
+        json_response = cliente_fd.requisitar(endpoint_path, params=query_params, extra_headers=extra_headers, timeout=20)
+        if json_response is None:
+            return {"endpoint": endpoint_path, "nome_descritivo": nome_descritivo, "status": "ERRO_REQUISICAO", "colunas": []}
+        inferencia = InferenciaEsquema()
+        colunas = extrair_colunas_fd_json(json_response, endpoint_path_hint=endpoint_path, inferencia=inferencia)
+        if inferencia.registros:
+            registro_esquemas.atualizar(chave_endpoint(endpoint_path, extra_headers), inferencia)
         
         print("Colunas encontradas:")
         if isinstance(colunas, list) and colunas:
@@ -110,22 +78,6 @@ def mapear_endpoint_fd(nome_descritivo, path_template, path_params=None, query_p
         
         return {"endpoint": endpoint_path, "nome_descritivo": nome_descritivo, "status": "SUCESSO", "colunas": colunas if isinstance(colunas, list) else [colunas]}
 
-    except requests.exceptions.Timeout:
-        print(f"Erro: Timeout ao tentar acessar {url_completa}")
-        return {"endpoint": endpoint_path, "nome_descritivo": nome_descritivo, "status": "TIMEOUT", "colunas": []}
-    except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code
-        error_text = e.response.text[:200] # Limita o tamanho da mensagem de erro
-        print(f"Erro HTTP {status_code} para {url_completa}: {error_text}...")
-        return {"endpoint": endpoint_path, "nome_descritivo": nome_descritivo, "status": f"HTTP_ERRO_{status_code}", "colunas": []}
-    except requests.exceptions.RequestException as e:
-        print(f"Erro na requisição para {url_completa}: {e}")
-        return {"endpoint": endpoint_path, "nome_descritivo": nome_descritivo, "status": "ERRO_REQUISICAO", "colunas": []}
-    except ValueError as e: # Erro ao decodificar JSON
-        print(f"Erro ao decodificar JSON da resposta de {url_completa}: {e}")
-        if 'response' in locals():
-             print(f"Resposta recebida (texto): {response.text[:200]}...")
-        return {"endpoint": endpoint_path, "nome_descritivo": nome_descritivo, "status": "ERRO_JSON", "colunas": []}
     except Exception as e:
         print(f"Um erro inesperado ocorreu durante o mapeamento de {url_completa}: {e}")
         return {"endpoint": endpoint_path, "nome_descritivo": nome_descritivo, "status": "ERRO_INESPERADO", "colunas": []}
@@ -176,21 +128,13 @@ ENDPOINTS_PARA_MAPEAR_FD = [
         "path_template": "/competitions/{competition_code_or_id}/matches",
         "path_params": {"competition_code_or_id": COMPETITION_CODE_EXEMPLO},
         "query_params": {"status": "FINISHED", "limit": 1},
-        "extra_headers": { # Cabeçalhos para "desdobrar" detalhes
-            "X-Unfold-Lineups": "true",
-            "X-Unfold-Bookings": "true",
-            "X-Unfold-Subs": "true",
-            "X-Unfold-Goals": "true"
-        }
+        "extra_headers": HEADERS_UNFOLD # Cabeçalhos para "desdobrar" detalhes
     },
     {
         "nome_descritivo": "Detalhes de uma Partida Específica (COM detalhes - X-Unfold)",
         "path_template": "/matches/{match_id}",
         "path_params": {"match_id": MATCH_ID_EXEMPLO}, # **OBTENHA UM ID DE PARTIDA VÁLIDO**
-        "extra_headers": {
-            "X-Unfold-Lineups": "true", "X-Unfold-Bookings": "true",
-            "X-Unfold-Subs": "true", "X-Unfold-Goals": "true"
-        }
+        "extra_headers": HEADERS_UNFOLD
     },
     {
         "nome_descritivo": "Detalhes de um Time", 
@@ -223,6 +167,10 @@ if __name__ == "__main__":
         if resultado:
             mapeamentos_completos_fd.append(resultado)
     
+    # Esquemas tipados e versionados, usados pelos coletores
+    registro_esquemas.salvar()
+    print(f"\nRegistro de esquemas atualizado: {registro_esquemas.caminho}")
+
     # Opcional: Salvar os resultados em um arquivo JSON
     arquivo_saida_fd = "mapeamento_colunas_football_data_org.json"
     try:
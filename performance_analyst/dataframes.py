@@ -1,15 +1,14 @@
-from soccerdata import FBref
-import pandas as pd
+from armazenamento_parquet import carregar_dataset
+from estatisticas_jogadores_partida import FONTE, coletar_partidas_jogadores
 
 liga = "Big 5 European Leagues Combined"
 temporada = "2022-2023"
 
-fbref = FBref(leagues=[liga], seasons=[temporada])
+# Coleta partida a partida, retomando do checkpoint (só baixa jogos novos)
+coletar_partidas_jogadores(liga, temporada)
 
-# Pegar dados de jogadores por partida 
-df_players = fbref.read_player_match_stats()
+# Pegar dados de jogadores por partida já gravados no dataset
+df_players = carregar_dataset(fonte=FONTE, liga=liga, temporada=temporada, stat_type="summary")
 
 print(df_players.columns)
 print(df_players.head())
-
-
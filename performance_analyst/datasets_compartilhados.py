@@ -0,0 +1,275 @@
+import os
+import sys
+import hashlib
+from pathlib import Path
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from armazenamento_parquet import PASTA_DATASET, carregar_dataset, listar_arquivos
+from esquemas_fbref import tipar_fbref
+from esquemas_football_data import RegistroEsquemas, ler_csv_tipado
+from manifesto_coleta import carregar_manifesto, hash_arquivo, salvar_manifesto
+from telemetria import contar, etapa, telemetria
+
+RAIZ_REPO = Path(__file__).resolve().parent.parent
+PASTA_FOOTBALL_DATA = RAIZ_REPO / "dados_coletados_football_data_org"
+PASTA_ARROW = os.getenv("PASTA_ARROW", str(RAIZ_REPO / "dados_arrow"))
+NOME_MANIFESTO = "manifesto_arrow.json"
+
+# Colunas acrescentadas por carregar_dataset que são constantes dentro de um dataset
+COLUNAS_CONSTANTES = ["fonte", "stat_type"]
+
+
+def _stat_type(caminho):
+    for parte in Path(caminho).parts:
+        if parte.startswith("stat_type="):
+            return unquote(parte.split("=", 1)[1])
+    return None
+
+
+def _por_stat_type(fonte, prefixo):
+    """Um dataset por stat_type da fonte: nome -> (arquivos, leitor)."""
+    grupos = {}
+    for arquivo in listar_arquivos(PASTA_DATASET, fonte=fonte):
+        grupos.setdefault(_stat_type(arquivo), []).append(arquivo)
+    return {
+        f"{prefixo}_{stat_type}": (arquivos, lambda s=stat_type: _ler_parquet(fonte, s))
+        for stat_type, arquivos in sorted(grupos.items())
+    }
+
+
+def _ler_parquet(fonte, stat_type=None):
+    """Partições do FBref com os tipos compactos (a leitura do Parquet devolve contagens anuláveis como float64)."""
+    df = carregar_dataset(fonte=fonte, stat_type=stat_type, raiz=PASTA_DATASET, restaurar_estrutura=False)
+    return tipar_fbref(df.drop(columns=COLUNAS_CONSTANTES, errors="ignore"), stat_type)
+
+
+def _construir_jogadores_temporada():
+    """Tabela larga montada na hora a partir das partições de jogadores, quando ainda não foi gravada."""
+    from jogadores_temporada import PlayerSeasonStore
+    return tipar_fbref(PlayerSeasonStore.construir(raiz=PASTA_DATASET).df)
+
+
+def _ler_csvs(arquivos, esquema, sep="."):
+    """CSVs da football-data.org tipados pelo registro, com competição e ano tirados do caminho."""
+    return pd.concat(
+        [
+            ler_csv_tipado(a, esquema, sep=sep, encoding="utf-8-sig").assign(competicao=a.parent.parent.name, ano=int(a.parent.name))
+            for a in arquivos
+        ],
+        ignore_index=True,
+    )
+
+
+def fontes():
+    """
+    Datasets materializáveis: nome -> (arquivos de entrada, leitor). Times e
+    jogadores por temporada vêm do dataset Parquet (um por stat_type), e a
+    tabela larga de jogadores, da gravada por jogadores_temporada.py ou, se
+    ainda não existir, das partições de jogadores; partidas e artilheiros,
+    dos CSVs da football-data.org.
+    """
+    registro = RegistroEsquemas()
+    partidas = sorted(PASTA_FOOTBALL_DATA.glob("partidas_competicao/*/*/partidas_*.csv"))
+    artilheiros = sorted(PASTA_FOOTBALL_DATA.glob("artilheiros/*/*/artilheiros_*.csv"))
+    larga = listar_arquivos(PASTA_DATASET, fonte="fbref_jogadores_larga")
+    jogadores = listar_arquivos(PASTA_DATASET, fonte="fbref_jogadores")
+
+    datasets = {}
+    datasets.update(_por_stat_type("fbref_times", "times"))
+    datasets.update(_por_stat_type("fbref_jogadores", "jogadores"))
+    if larga:
+        datasets["jogadores_temporada"] = (larga, lambda: _ler_parquet("fbref_jogadores_larga"))
+    elif jogadores:
+        datasets["jogadores_temporada"] = (jogadores, _construir_jogadores_temporada)
+    if partidas:
+        esquema = registro.esquema("/competitions/{id}/matches [unfold]")
+        datasets["partidas"] = (partidas, lambda: _ler_csvs(partidas, esquema, sep="_"))
+    if artilheiros:
+        esquema = registro.esquema("/competitions/{id}/scorers")
+        datasets["artilheiros"] = (artilheiros, lambda: _ler_csvs(artilheiros, esquema))
+    return datasets
+
+
+def _caminho_relativo(arquivo):
+    """Caminho da entrada relativo ao dataset Parquet ou ao repositório: mover ou clonar o repositório não muda a assinatura."""
+    arquivo = Path(arquivo).resolve()
+    for raiz in (Path(PASTA_DATASET).resolve(), RAIZ_REPO):
+        if arquivo.is_relative_to(raiz):
+            return arquivo.relative_to(raiz).as_posix()
+    return arquivo.as_posix()
+
+
+def _assinatura(arquivos):
+    """Hash do conteúdo de todas as entradas do dataset."""
+    md5 = hashlib.md5()
+    for arquivo in arquivos:
+        md5.update(_caminho_relativo(arquivo).encode("utf-8"))
+        md5.update(hash_arquivo(arquivo).encode("utf-8"))
+    return md5.hexdigest()
+
+
+def _tabela_arrow(df):
+    """
+    DataFrame -> tabela Arrow em um único lote (dicionários unificados),
+    para que as colunas numéricas possam ser lidas sem cópia. Colunas de
+    texto com tipos misturados, comuns nos CSVs, viram string.
+    """
+    try:
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        mistas = {c: "string" for c in df.columns if pd.api.types.is_object_dtype(df[c])}
+        tabela = pa.Table.from_pandas(df.astype(mistas), preserve_index=False)
+    return tabela.unify_dictionaries().combine_chunks()
+
+
+def _gravar_ipc(tabela, caminho):
+    """Grava o arquivo IPC (sem compressão, para poder ser mapeado) de forma atômica."""
+    temporario = f"{caminho}.tmp"
+    with pa.OSFile(temporario, "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+
+
+def _remover_versoes_antigas(pasta, nome, atual):
+    """Apaga versões anteriores do dataset; as que ainda estão abertas em algum processo ficam para depois."""
+    for caminho in Path(pasta).glob(f"{nome}-*.arrow"):
+        if caminho.name != atual:
+            try:
+                caminho.unlink()
+            except OSError:
+                contar("arrow_versoes_em_uso")
+
+
+def materializar(pasta=PASTA_ARROW, nomes=None, forcar=False):
+    """
+    Grava cada dataset como um arquivo Arrow IPC em PASTA_ARROW. O nome do
+    arquivo leva a assinatura das entradas, e o manifesto aponta para a
+    versão atual: quem já tem a versão anterior aberta continua lendo-a
+    enquanto a nova é gravada. Datasets cujas entradas não mudaram não são
+    reescritos. Devolve os nomes dos datasets gravados.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminho_manifesto = os.path.join(pasta, NOME_MANIFESTO)
+    manifesto = carregar_manifesto(caminho_manifesto)
+
+    gravados = []
+    for nome, (arquivos, ler) in fontes().items():
+        if nomes and nome not in nomes:
+            continue
+        assinatura = _assinatura(arquivos)
+        atual = manifesto.get(nome, {})
+        if not forcar and atual.get("assinatura") == assinatura and os.path.exists(os.path.join(pasta, atual["arquivo"])):
+            contar("arrow_sem_alteracao")
+            continue
+
+        with etapa("arrow_leitura"):
+            df = ler()
+        if df.empty:
+            continue
+        with etapa("arrow_escrita"):
+            tabela = _tabela_arrow(df)
+            arquivo = f"{nome}-{assinatura[:12]}.arrow"
+            _gravar_ipc(tabela, os.path.join(pasta, arquivo))
+        manifesto[nome] = {
+            "arquivo": arquivo,
+            "assinatura": assinatura,
+            "linhas": tabela.num_rows,
+            "colunas": tabela.num_columns,
+            "bytes": os.path.getsize(os.path.join(pasta, arquivo)),
+        }
+        salvar_manifesto(manifesto, caminho_manifesto)
+        _remover_versoes_antigas(pasta, nome, arquivo)
+        contar("arrow_datasets_gravados")
+        gravados.append(nome)
+        print(f"  {nome}: {tabela.num_rows} linhas x {tabela.num_columns} colunas -> {arquivo}")
+    return gravados
+
+
+class DatasetCompartilhado:
+    """
+    Dataset materializado aberto por mapeamento de memória: abrir não lê os
+    dados, e cada coluna só é trazida do disco (pelo cache de páginas do
+    sistema, compartilhado entre processos) quando é acessada. Colunas
+    numéricas sem nulos viram Series sem cópia, somente leitura.
+    """
+
+    def __init__(self, nome, pasta=PASTA_ARROW):
+        manifesto = carregar_manifesto(os.path.join(pasta, NOME_MANIFESTO))
+        if nome not in manifesto:
+            raise KeyError(f"Dataset '{nome}' não materializado em {pasta}; rode datasets_compartilhados.py.")
+        self.nome = nome
+        self.caminho = os.path.join(pasta, manifesto[nome]["arquivo"])
+        self._mapa = pa.memory_map(self.caminho, "r")
+        self.tabela = pa.ipc.open_file(self._mapa).read_all()
+
+    @property
+    def colunas(self):
+        return self.tabela.column_names
+
+    def __len__(self):
+        return self.tabela.num_rows
+
+    def coluna(self, nome):
+        coluna = self.tabela.column(nome)
+        if coluna.num_chunks == 1:
+            try:
+                return pd.Series(coluna.chunk(0).to_numpy(zero_copy_only=True), name=nome)
+            except pa.ArrowInvalid:
+                pass
+        return coluna.to_pandas().rename(nome)
+
+    def pandas(self, colunas=None, filtros=None):
+        """
+        DataFrame só com as colunas pedidas e, opcionalmente, as linhas que
+        atendem aos filtros no formato do pyarrow, ex.: [('ano', '=', 2024)].
+        """
+        tabela = self.tabela
+        if filtros:
+            expressao = None
+            for coluna, operador, valor in filtros:
+                termo = _COMPARACOES[operador](pc.field(coluna), valor)
+                expressao = termo if expressao is None else expressao & termo
+            tabela = tabela.filter(expressao)
+        if colunas is not None:
+            tabela = tabela.select(list(colunas))
+        return tabela.to_pandas()
+
+
+_COMPARACOES = {
+    "=": lambda a, b: a == b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a.isin(b),
+}
+
+_ABERTOS = {}
+
+
+def abrir(nome, pasta=PASTA_ARROW):
+    """Dataset compartilhado, reaproveitado no processo enquanto o manifesto apontar para o mesmo arquivo."""
+    dataset = _ABERTOS.get((pasta, nome))
+    arquivo = carregar_manifesto(os.path.join(pasta, NOME_MANIFESTO)).get(nome, {}).get("arquivo")
+    if dataset is None or os.path.basename(dataset.caminho) != arquivo:
+        dataset = _ABERTOS[(pasta, nome)] = DatasetCompartilhado(nome, pasta)
+    return dataset
+
+
+def listar(pasta=PASTA_ARROW):
+    """Datasets materializados: nome -> linhas, colunas, bytes e arquivo."""
+    return carregar_manifesto(os.path.join(pasta, NOME_MANIFESTO))
+
+
+if __name__ == "__main__":
+    #  Uso: python datasets_compartilhados.py [--forcar] [DATASET ...]
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    gravados = materializar(nomes=argumentos or None, forcar="--forcar" in sys.argv)
+    print(f"{len(gravados)} datasets gravados em {PASTA_ARROW}.")
+    telemetria.salvar_relatorio("datasets_compartilhados")
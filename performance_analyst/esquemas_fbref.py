@@ -0,0 +1,224 @@
+import pandas as pd
+
+from armazenamento_parquet import _nome_coluna
+from telemetria import contar, etapa
+
+# Tradução das colunas por stat_type (cabeçalho de dois níveis -> nome em português)
+TRADUCOES = {
+    "standard": {
+        ('players_used', ''): 'Jogadores Utilizados',
+        ('Age', ''): 'Idade Média',
+        ('Poss', ''): 'Posse (%)',
+        ('Playing Time', 'MP'): 'Partidas',
+        ('Playing Time', 'Starts'): 'Titularidades',
+        ('Playing Time', 'Min'): 'Minutos Jogados',
+        ('Playing Time', '90s'): 'Jogos (90min)',
+        ('Performance', 'Gls'): 'Gols',
+        ('Performance', 'Ast'): 'Assistências',
+        ('Performance', 'G+A'): 'Gols+Assistências',
+        ('Performance', 'G-PK'): 'Gols sem Pênalti',
+        ('Performance', 'PK'): 'Pênaltis Convertidos',
+        ('Performance', 'PKatt'): 'Pênaltis Tentados',
+        ('Performance', 'CrdY'): 'Cartões Amarelos',
+        ('Performance', 'CrdR'): 'Cartões Vermelhos',
+        ('Expected', 'xG'): 'xG',
+        ('Expected', 'npxG'): 'xG (sem pênalti)',
+        ('Expected', 'xAG'): 'xAG',
+        ('Expected', 'npxG+xAG'): 'npxG+xAG',
+        ('Progression', 'PrgC'): 'Conduções Progressivas',
+        ('Progression', 'PrgP'): 'Passes Progressivos',
+        ('Per 90 Minutes', 'Gls'): 'Gols/90min',
+        ('Per 90 Minutes', 'Ast'): 'Assist/90min',
+        ('Per 90 Minutes', 'G+A'): 'G+A/90min',
+        ('Per 90 Minutes', 'G-PK'): 'Gols SP/90min',
+        ('Per 90 Minutes', 'G+A-PK'): 'G+A SP/90min',
+        ('Per 90 Minutes', 'xG'): 'xG/90min',
+        ('Per 90 Minutes', 'xAG'): 'xAG/90min',
+        ('Per 90 Minutes', 'xG+xAG'): 'xG+xAG/90min',
+        ('Per 90 Minutes', 'npxG'): 'npxG/90min',
+        ('Per 90 Minutes', 'npxG+xAG'): 'npxG+xAG/90min',
+        ('url', ''): 'URL',
+    },
+}
+
+# Rótulos repetidos em muitas linhas: categóricos
+COLUNAS_CATEGORICAS = {"nation", "pos", "team", "league", "season", "squad", "comp", "opponent", "venue"}
+
+# Identificadores, links e nomes: sempre texto, mesmo quando parecem números
+# (o game_id '01234567' não pode virar 1234567). Vale também para id e *_id.
+COLUNAS_TEXTO = {
+    "game", "game_id", "url", "match_report", "player", "notes", "referee", "captain", "formation",
+    "opp formation", "date", "time", "day", "round", "result", "score", "home_team", "away_team",
+}
+
+# Estatísticas que o FBref publica com cabeçalho de um nível só; as de dois
+# níveis ('Performance', 'Gls') já são estatísticas. Só estas colunas são
+# convertidas de texto para número; as demais só são compactadas se já
+# forem numéricas (como as da tabela larga relida do Parquet).
+COLUNAS_NUMERICAS = {
+    "players_used", "#pl", "mp", "starts", "min", "90s", "gls", "ast", "att", "int", "kp", "ppa", "1/3", "crspa",
+    "prgp", "prgc", "prgr", "rec", "clr", "err", "tkl", "tkl+int", "xg", "xga", "npxg", "xag", "a-xag", "gf", "ga",
+    "gd", "w", "d", "l", "pts", "week", "attendance", "home_xg", "away_xg", "jersey_number",
+} | {traduzido.lower() for traduzido in TRADUCOES["standard"].values() if traduzido != "URL"}
+
+# Trechos de nome que indicam taxa, média ou valor esperado (float32); as
+# demais colunas numéricas são contagens (inteiros pequenos). Comparados em
+# minúsculas, já que nomes achatados como 'home_xg' vêm assim
+TRECHOS_TAXA = ("%", "90", "/", "xg", "xa", "_dist", "avglen", "avgdist", "poss", "age", "ppm", "on-off")
+
+
+def idade_numerica(serie):
+    """Idade do FBref em anos: '25-123' (anos-dias) -> 25.34; '25' e '26.9' ficam como estão."""
+    texto = serie.astype("string").str.strip()
+    partes = texto.str.split("-", n=1, expand=True).reindex(columns=[0, 1])
+    anos = pd.to_numeric(partes[0], errors="coerce")
+    dias = pd.to_numeric(partes[1], errors="coerce").fillna(0)
+    return (anos + dias / 365.25).astype("float32")
+
+
+def e_texto(nome):
+    nome = nome.lower()
+    return nome in COLUNAS_TEXTO or nome == "id" or nome.endswith("_id") or "url" in nome
+
+
+def e_estatistica(coluna):
+    """Coluna que pode ser convertida de texto para número: cabeçalho de dois níveis ou nome da lista."""
+    if isinstance(coluna, tuple) and all(str(p) and not str(p).startswith("Unnamed") for p in coluna):
+        return True
+    return _nome_coluna(coluna).lower() in COLUNAS_NUMERICAS
+
+
+def classificar(nome):
+    """Tipo compacto de uma coluna pelo nome achatado."""
+    if nome.lower() == "age":
+        return "idade"
+    if nome == "born":
+        return "ano"
+    if nome in COLUNAS_CATEGORICAS:
+        return "categoria"
+    if e_texto(nome):
+        return "texto"
+    if any(trecho in nome.lower() for trecho in TRECHOS_TAXA):
+        return "taxa"
+    return "contagem"
+
+
+def _mapeamento(stat_type, colunas):
+    """
+    Mapeamento de um conjunto de cabeçalhos: [(coluna, nome achatado,
+    nome traduzido ou None, tipo, se o texto pode virar número)]. Calculado uma vez por (stat_type,
+    cabeçalhos) e reaproveitado em todas as tabelas com o mesmo layout.
+    """
+    chave = (stat_type, colunas)
+    if chave not in _MAPEAMENTOS:
+        traducao = TRADUCOES.get(stat_type, {})
+        _MAPEAMENTOS[chave] = [
+            (coluna, _nome_coluna(coluna), traducao.get(coluna), classificar(_nome_coluna(coluna)), e_estatistica(coluna))
+            for coluna in colunas
+        ]
+    return _MAPEAMENTOS[chave]
+
+
+_MAPEAMENTOS = {}
+
+
+def _numerica(serie, coagir):
+    """Série numérica, ou None se a coluna não for numérica (ou, sem coagir, se ainda for texto)."""
+    if pd.api.types.is_bool_dtype(serie):
+        return None
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie
+    if not coagir:
+        return None
+    valores = pd.to_numeric(serie, errors="coerce")
+    if serie.notna().sum() == 0 or valores.notna().sum() < serie.notna().sum():
+        return None
+    return valores
+
+
+def _inteiro_pequeno(valores):
+    """Int16/Int32 (anuláveis) se os valores forem inteiros; senão float32."""
+    validos = valores.dropna()
+    if len(validos) and not (validos % 1 == 0).all():
+        return valores.astype("float32")
+    maximo = validos.abs().max() if len(validos) else 0
+    return valores.astype("Int16" if maximo < 2 ** 15 else "Int32")
+
+
+def _converter(serie, tipo, coagir):
+    if tipo == "idade":
+        return idade_numerica(serie)
+    if tipo == "categoria":
+        return serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype("category")
+    if tipo == "texto":
+        return serie.astype("string")
+    valores = _numerica(serie, coagir)
+    if valores is None:
+        return serie
+    if tipo == "taxa":
+        return valores.astype("float32")
+    if tipo == "ano":
+        return valores.astype("Int16")
+    return _inteiro_pequeno(valores)
+
+
+class EsquemaFBref:
+    """
+    Camada de esquema das tabelas do FBref para um stat_type: achata e
+    traduz os cabeçalhos de dois níveis por um mapeamento pré-compilado e
+    converte as colunas para tipos compactos (categóricas para rótulos,
+    string para ids, links e nomes, inteiros pequenos para contagens,
+    float32 para taxas e idade numérica).
+    """
+
+    def __init__(self, stat_type=None):
+        self.stat_type = stat_type
+
+    def mapeamento(self, df):
+        return _mapeamento(self.stat_type, tuple(df.columns))
+
+    def tipar(self, df):
+        """Converte os tipos mantendo os cabeçalhos originais (e o índice)."""
+        with etapa("tipagem_fbref"):
+            df = df.copy()
+            for posicao, (_, _, _, tipo, coagir) in enumerate(self.mapeamento(df)):
+                df.isetitem(posicao, _converter(df.iloc[:, posicao], tipo, coagir))
+        contar("fbref_tabelas_tipadas")
+        return df
+
+    def achatar(self, df):
+        """Tipos compactos com cabeçalhos de um nível (traduzidos quando houver tradução)."""
+        nomes = [traduzido or nome for _, nome, traduzido, _, _ in self.mapeamento(df)]
+        df = self.tipar(df)
+        df.columns = nomes
+        return df
+
+    def traduzir(self, df):
+        """Só as colunas com tradução, na ordem da tradução, com nomes em português e tipos compactos."""
+        traduzidas = {coluna: posicao for posicao, (coluna, _, traduzido, _, _) in enumerate(self.mapeamento(df)) if traduzido}
+        ordem = [traduzidas[c] for c in TRADUCOES.get(self.stat_type, {}) if c in traduzidas]
+        if not ordem:
+            raise ValueError("Nenhuma das colunas desejadas está disponível.")
+        return self.achatar(df.iloc[:, ordem])
+
+
+def tipar_fbref(df, stat_type=None):
+    """Atalho para EsquemaFBref(stat_type).tipar(df)."""
+    return EsquemaFBref(stat_type).tipar(df)
+
+
+if __name__ == "__main__":
+    #  Compara a memória das tabelas de jogadores em CSV antes e depois da tipagem
+    import glob
+    import os
+    import sys
+
+    pasta = sys.argv[1] if len(sys.argv) > 1 else "Big 5 European Leagues Combined"
+    antes = depois = 0
+    for caminho in sorted(glob.glob(os.path.join(pasta, "*", "*.csv"))):
+        df = pd.read_csv(caminho, header=[0, 1])
+        stat_type = os.path.splitext(os.path.basename(caminho))[0]
+        antes += df.memory_usage(deep=True).sum()
+        depois += EsquemaFBref(stat_type).tipar(df).memory_usage(deep=True).sum()
+    if antes:
+        print(f"{antes / 2**20:.1f} MB -> {depois / 2**20:.1f} MB ({antes / depois:.1f}x menor)")
@@ -0,0 +1,327 @@
+import os
+import re
+import json
+
+import pandas as pd
+from cache_respostas import PASTA_CACHE_PADRAO
+from cliente_football_data import BASE_URL_FD
+from manifesto_coleta import agora_utc, carregar_manifesto, salvar_manifesto
+from telemetria import contar, etapa
+
+PASTA_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMINHO_REGISTRO = os.path.join(PASTA_REPOSITORIO, "dados_coletados_football_data_org", "esquemas_football_data.json")
+
+# Chaves que contêm as listas de registros nas respostas da API
+CHAVES_LISTA = ['competitions', 'matches', 'standings', 'scorers', 'squad', 'referees', 'bookings',
+                'goals', 'substitutions', 'seasons', 'teams', 'persons']
+
+_DATA_HORA = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?$")
+_DATA = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Tipo lógico -> dtype do pandas. Combinações não listadas viram object.
+DTYPES = {
+    frozenset(["bool"]): "boolean",
+    frozenset(["int"]): "Int64",
+    frozenset(["float"]): "Float64",
+    frozenset(["int", "float"]): "Float64",
+    frozenset(["texto"]): "string",
+    frozenset(["texto", "data"]): "string",
+    frozenset(["texto", "data_hora"]): "string",
+    frozenset(["data"]): "datetime64[ns]",
+    frozenset(["data_hora"]): "datetime64[ns, UTC]",
+    frozenset(["data", "data_hora"]): "datetime64[ns, UTC]",
+    frozenset(["lista"]): "lista",
+}
+
+
+def tipo_valor(valor):
+    """Tipo lógico de um valor JSON (datas ISO são reconhecidas nas strings)."""
+    if valor is None:
+        return "nulo"
+    if isinstance(valor, bool):
+        return "bool"
+    if isinstance(valor, int):
+        return "int"
+    if isinstance(valor, float):
+        return "float"
+    if isinstance(valor, str):
+        if _DATA_HORA.match(valor):
+            return "data_hora"
+        if _DATA.match(valor):
+            return "data"
+        return "texto"
+    if isinstance(valor, list):
+        return "lista"
+    return "objeto"
+
+
+def dtype_coluna(tipos):
+    """dtype do pandas para o conjunto de tipos observados em uma coluna."""
+    return DTYPES.get(frozenset(tipos) - {"nulo"}, "object")
+
+
+def chave_endpoint(endpoint_path, headers=None):
+    """
+    Chave do endpoint no registro: códigos e ids do caminho viram {id} e as
+    respostas com X-Unfold (que trazem mais campos) têm uma chave própria.
+    """
+    chave = re.sub(r"/(competitions|teams|persons|matches|areas)/[^/]+", r"/\1/{id}", endpoint_path)
+    if any(k.lower().startswith("x-unfold") for k in (headers or {})):
+        chave += " [unfold]"
+    return chave
+
+
+def registros_da_resposta(dados):
+    """
+    (chave da lista, registros) de uma resposta: a primeira lista conhecida
+    não vazia, ou a própria resposta como registro único.
+    """
+    if isinstance(dados, list):
+        return None, dados
+    if not isinstance(dados, dict):
+        return None, []
+    for chave in CHAVES_LISTA:
+        if isinstance(dados.get(chave), list) and dados[chave]:
+            return chave, dados[chave]
+    return None, [dados]
+
+
+class InferenciaEsquema:
+    """
+    Esquema inferido em fluxo: cada registro é achatado (como no
+    json_normalize) e seus tipos somados à união das colunas já vistas, sem
+    montar DataFrames. Colunas ausentes em parte dos registros são anuláveis.
+    """
+
+    def __init__(self):
+        self.registros = 0
+        self._tipos = {}
+        self._presencas = {}
+
+    def _achatar(self, objeto, prefixo=""):
+        for chave, valor in objeto.items():
+            nome = f"{prefixo}.{chave}" if prefixo else chave
+            if isinstance(valor, dict) and valor:
+                yield from self._achatar(valor, nome)
+            else:
+                yield nome, tipo_valor(valor)
+
+    def observar(self, registros):
+        for registro in registros:
+            if not isinstance(registro, dict):
+                continue
+            self.registros += 1
+            for nome, tipo in self._achatar(registro):
+                self._tipos.setdefault(nome, set()).add(tipo)
+                self._presencas[nome] = self._presencas.get(nome, 0) + 1
+        return self
+
+    @property
+    def colunas(self):
+        """Coluna -> tipos observados (com "nulo" se faltou em algum registro)."""
+        return {
+            nome: tipos | {"nulo"} if self._presencas[nome] < self.registros else tipos
+            for nome, tipos in self._tipos.items()
+        }
+
+
+def inferir_resposta(dados):
+    """Inferência sobre todos os registros da lista principal de uma resposta."""
+    return InferenciaEsquema().observar(registros_da_resposta(dados)[1])
+
+
+class RegistroEsquemas:
+    """
+    Registro versionado dos esquemas por endpoint, em JSON. Cada atualização
+    une o esquema registrado ao observado; colunas novas ou mudanças de
+    dtype geram uma nova versão com o histórico da mudança.
+    """
+
+    def __init__(self, caminho=CAMINHO_REGISTRO):
+        self.caminho = caminho
+        self.esquemas = carregar_manifesto(caminho)
+        self.alterado = False
+
+    def esquema(self, chave):
+        return self.esquemas.get(chave)
+
+    def atualizar(self, chave, inferencia):
+        """
+        Incorpora uma inferência ao esquema do endpoint e devolve o desvio em
+        relação à versão registrada: colunas adicionadas, tipos alterados e
+        colunas sempre presentes que não vieram nesta resposta.
+        """
+        atual = self.esquemas.get(chave, {"versao": 0, "colunas": {}, "historico": []})
+        colunas = {nome: set(info["tipos"]) for nome, info in atual["colunas"].items()}
+        observadas = inferencia.colunas
+
+        adicionadas = sorted(set(observadas) - set(colunas))
+        ausentes = sorted(
+            nome for nome, tipos in colunas.items()
+            if nome not in observadas and "nulo" not in tipos
+        )
+        for nome in set(colunas) - set(observadas):
+            colunas[nome].add("nulo")
+        for nome in adicionadas:
+            colunas[nome] = set(observadas[nome])
+            if atual["versao"]:
+                colunas[nome].add("nulo")
+
+        tipos_alterados = {}
+        for nome, tipos in observadas.items():
+            if nome in adicionadas:
+                continue
+            antigo = dtype_coluna(colunas[nome])
+            colunas[nome] |= tipos
+            novo = dtype_coluna(colunas[nome])
+            if novo != antigo:
+                tipos_alterados[nome] = [antigo, novo]
+
+        desvio = {"adicionadas": adicionadas, "tipos_alterados": tipos_alterados, "ausentes": ausentes}
+        novas_colunas = {
+            nome: {"tipos": sorted(tipos), "dtype": dtype_coluna(tipos)} for nome, tipos in sorted(colunas.items())
+        }
+        if novas_colunas != atual["colunas"]:
+            versao = atual["versao"] + 1 if adicionadas or tipos_alterados or not atual["versao"] else atual["versao"]
+            historico = list(atual["historico"])
+            if versao != atual["versao"]:
+                historico.append({
+                    "versao": versao,
+                    "em": agora_utc().isoformat(timespec="seconds"),
+                    "adicionadas": adicionadas if atual["versao"] else [],
+                    "tipos_alterados": tipos_alterados,
+                })
+            self.esquemas[chave] = {"versao": versao, "colunas": novas_colunas, "historico": historico}
+            self.alterado = True
+        if atual["versao"] and (adicionadas or tipos_alterados or ausentes):
+            contar("fd_desvios_esquema")
+        return desvio
+
+    def salvar(self):
+        if self.alterado:
+            salvar_manifesto(self.esquemas, self.caminho)
+            self.alterado = False
+
+
+def imprimir_desvio(chave, desvio, versao):
+    if desvio["adicionadas"]:
+        print(f"    Esquema de {chave} (v{versao}): colunas novas {desvio['adicionadas']}")
+    for nome, (antigo, novo) in desvio["tipos_alterados"].items():
+        print(f"    Esquema de {chave} (v{versao}): '{nome}' mudou de {antigo} para {novo}")
+    if desvio["ausentes"]:
+        print(f"    Esquema de {chave} (v{versao}): colunas sempre presentes que não vieram {desvio['ausentes']}")
+
+
+def observar_resposta(registro, endpoint_path, dados, headers=None):
+    """Atualiza o registro com uma resposta, imprime o desvio e devolve o esquema do endpoint."""
+    chave = chave_endpoint(endpoint_path, headers)
+    with etapa("inferencia_esquema"):
+        inferencia = inferir_resposta(dados)
+    if inferencia.registros:
+        ja_registrado = registro.esquema(chave) is not None
+        desvio = registro.atualizar(chave, inferencia)
+        if ja_registrado:
+            imprimir_desvio(chave, desvio, registro.esquema(chave)["versao"])
+    return registro.esquema(chave)
+
+
+def _dtypes(esquema, sep):
+    """Coluna (com o separador da tabela) -> dtype, sem as listas, que viram tabelas filhas."""
+    return {
+        nome.replace(".", sep): info["dtype"]
+        for nome, info in esquema["colunas"].items()
+        if info["dtype"] != "lista"
+    }
+
+
+def _converter(serie, dtype):
+    if dtype.startswith("datetime64"):
+        return pd.to_datetime(serie, errors="coerce", utc="UTC" in dtype)
+    if dtype in ("Int64", "Float64"):
+        return pd.to_numeric(serie, errors="coerce").astype(dtype)
+    return serie.astype(dtype)
+
+
+def aplicar_esquema(df, esquema, sep="."):
+    """
+    Tipa as colunas do DataFrame conforme o esquema registrado e acrescenta,
+    já tipadas e vazias, as colunas do esquema que esta resposta não trouxe.
+    Colunas fora do esquema ficam como estão.
+    """
+    if not esquema:
+        return df
+    dtypes = _dtypes(esquema, sep)
+    faltantes = [nome for nome in dtypes if nome not in df.columns]
+    if faltantes:
+        df = pd.concat(
+            [df, pd.DataFrame({nome: pd.Series(index=df.index, dtype=dtypes[nome]) for nome in faltantes})],
+            axis=1,
+        )
+    for nome, dtype in dtypes.items():
+        if str(df[nome].dtype) != dtype:
+            try:
+                df[nome] = _converter(df[nome], dtype)
+            except (TypeError, ValueError):
+                contar("fd_colunas_sem_conversao")
+    return df
+
+
+def datas_iso(df):
+    """
+    Cópia para gravação em CSV com as datas-hora de volta no formato da API
+    ('2024-08-23T18:30:00Z'); sem isso o pandas gravaria '2024-08-23 18:30:00+00:00'.
+    """
+    df = df.copy()
+    for nome in df.columns:
+        if isinstance(df[nome].dtype, pd.DatetimeTZDtype):
+            df[nome] = df[nome].dt.tz_convert("UTC").dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return df
+
+
+def ler_csv_tipado(caminho, esquema, sep=".", **kwargs):
+    """
+    Lê um CSV já gravado com os dtypes do esquema registrado, em vez de
+    deixar o pandas inferi-los a partir do texto.
+    """
+    if not esquema:
+        return pd.read_csv(caminho, **kwargs)
+    # Inteiros passam por Float64: arquivos antigos podem tê-los gravado como 1.0
+    leitura = {
+        nome: "Float64" if dtype == "Int64" else dtype
+        for nome, dtype in _dtypes(esquema, sep).items()
+        if dtype in ("string", "boolean", "Int64", "Float64")
+    }
+    return aplicar_esquema(pd.read_csv(caminho, dtype=leitura, **kwargs), esquema, sep)
+
+
+def inferir_do_cache(registro, pasta=PASTA_CACHE_PADRAO):
+    """
+    Reconstrói o registro percorrendo todas as respostas do cache, uma de
+    cada vez. Entradas gravadas antes de o cache guardar os cabeçalhos
+    contam como respostas sem X-Unfold.
+    """
+    respostas = 0
+    for entrada in os.scandir(pasta):
+        if not entrada.name.endswith(".json"):
+            continue
+        try:
+            with open(entrada.path, "r", encoding="utf-8") as f:
+                conteudo = json.load(f)
+        except ValueError:
+            continue
+        endpoint_path = conteudo.get("url", "").replace(BASE_URL_FD, "", 1)
+        chave = chave_endpoint(endpoint_path, conteudo.get("headers"))
+        inferencia = inferir_resposta(conteudo.get("dados"))
+        if inferencia.registros:
+            registro.atualizar(chave, inferencia)
+            respostas += 1
+    return respostas
+
+
+if __name__ == "__main__":
+    registro = RegistroEsquemas()
+    respostas = inferir_do_cache(registro)
+    registro.salvar()
+    print(f"{respostas} respostas do cache analisadas; esquemas em {registro.caminho}:")
+    for chave, esquema in sorted(registro.esquemas.items()):
+        print(f"  {chave}: v{esquema['versao']}, {len(esquema['colunas'])} colunas")
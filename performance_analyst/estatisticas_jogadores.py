@@ -1,5 +1,8 @@
-import os
 from soccerdata import FBref
+from soccerdata.fbref import BIG_FIVE_DICT
+from armazenamento_parquet import salvar_dataset
+from esquemas_fbref import tipar_fbref
+from telemetria import contar, etapa, telemetria
 
 ligas = ["Big 5 European Leagues Combined"]
 temporadas = [
@@ -13,28 +16,91 @@ stat_types = [
     "possession", "playing_time", "misc"
 ]
 
-fbref = FBref(leagues=ligas, seasons=temporadas)
 
-base_path = "dados_jogadores"
+LIGA_BIG_5 = "Big 5 European Leagues Combined"
+
+
+def ligas_do_indice(liga):
+    """
+    Valores do nível 'league' que o soccerdata devolve para a liga pedida:
+    na leitura combinada das 5 grandes ligas cada linha traz a sua própria
+    liga ('ENG-Premier League', ...).
+    """
+    if liga == LIGA_BIG_5:
+        return set(BIG_FIVE_DICT.values())
+    return {liga}
+
+
+def dividir_por_liga(df, liga):
+    """
+    (liga, DataFrame) por liga real das linhas: a leitura combinada das 5
+    grandes ligas vira uma partição por liga, como nas demais leituras.
+    """
+    if liga != LIGA_BIG_5 or "league" not in df.index.names:
+        yield liga, df
+        return
+    df = df[df.index.get_level_values("league").isin(ligas_do_indice(liga))]
+    for liga_linha, df_liga in df.groupby(level="league", sort=True):
+        yield liga_linha, df_liga
+
+
+def codigo_temporada(temporada):
+    """Converte '2016-2017' no código de temporada usado pelo FBref ('1617')."""
+    return temporada[2:4] + temporada[-2:]
+
+
+def coletar_stat_type(fbref, stat_type, liga, temporadas):
+    """
+    Lê o stat_type uma única vez para todas as temporadas e particiona o
+    resultado pelos níveis 'league'/'season' do índice, gerando uma
+    partição real por liga e temporada (a leitura combinada das 5 grandes
+    ligas vira uma partição por liga). Partições sem mudanças não são
+    reescritas.
+    """
+    print(f"Coletando {stat_type} - {liga} ({len(temporadas)} temporadas) ...")
+    with etapa("fbref_read_player_season_stats"):
+        df = fbref.read_player_season_stats(stat_type=stat_type)
+    df = tipar_fbref(df, stat_type)
+
+    if "league" in df.index.names:
+        df = df[df.index.get_level_values("league").isin(ligas_do_indice(liga))]
+
+    temporadas_por_codigo = {codigo_temporada(t): t for t in temporadas}
+    temporadas_encontradas = set()
+
+    for (liga_linha, codigo), df_temporada in df.groupby(level=["league", "season"], sort=False):
+        temporada = temporadas_por_codigo.get(codigo)
+        if temporada is None:
+            continue
+        temporadas_encontradas.add(temporada)
+
+        arquivo, alterado = salvar_dataset(df_temporada, "fbref_jogadores", liga_linha, temporada, stat_type)
+        if alterado:
+            print(f"Salvo em {arquivo}")
+        else:
+            print(f"Sem alterações em {arquivo}")
 
-for liga in ligas:
     for temporada in temporadas:
+        if temporada not in temporadas_encontradas:
+            print(f"Aviso: nenhum dado de {stat_type} para {liga} {temporada}")
+
+
+def coletar(ligas=ligas, temporadas=temporadas, stat_types=stat_types):
+    """Coleta todos os stat_types; devolve a lista de (liga, stat_type) que falharam."""
+    fbref = FBref(leagues=ligas, seasons=temporadas)
+
+    falhas = []
+    for liga in ligas:
         for stat_type in stat_types:
             try:
-                print(f"Coletando {stat_type} - {liga} {temporada} ...")
-                df = fbref.read_player_season_stats(stat_type=stat_type)
-                # Filtra por liga e temporada, se as colunas existirem
-                if "league" in df.columns and "season" in df.columns:
-                    df = df[(df["league"] == liga) & (df["season"] == temporada)]
-                else:
-                    print(f"Aviso: colunas 'league' ou 'season' não encontradas para {stat_type} {temporada}")
-                
-                # Salva os dados
-                pasta = os.path.join(base_path, liga, temporada)
-                os.makedirs(pasta, exist_ok=True)
-                arquivo = os.path.join(pasta, f"{stat_type}.csv")
-                df.to_csv(arquivo, index=False)
-                print(f"Salvo em {arquivo}")
-
+                coletar_stat_type(fbref, stat_type, liga, temporadas)
             except Exception as e:
-                print(f"Erro ao coletar {stat_type} - {liga} {temporada}: {e}")
+                contar("stat_types_com_falha")
+                print(f"Erro ao coletar {stat_type} - {liga}: {e}")
+                falhas.append((liga, stat_type))
+    return falhas
+
+
+if __name__ == "__main__":
+    coletar()
+    telemetria.salvar_relatorio("estatisticas_jogadores")
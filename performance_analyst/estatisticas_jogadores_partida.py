@@ -0,0 +1,138 @@
+import os
+import logging
+from soccerdata import FBref
+from armazenamento_parquet import PASTA_DATASET, caminho_particao, salvar_dataset
+from esquemas_fbref import tipar_fbref
+from manifesto_coleta import carregar_manifesto, salvar_manifesto
+from telemetria import contar, etapa, telemetria
+
+FONTE = "fbref_partidas_jogadores"
+CAMINHO_CHECKPOINT = os.path.join(PASTA_DATASET, "checkpoint_partidas_jogadores.json")
+
+# Partidas pedidas ao soccerdata por chamada: cada chamada relê o calendário
+TAMANHO_LOTE = 20
+
+# Ligas e temporadas coletadas por padrão (linha de comando e orquestrador)
+ligas = ["Big 5 European Leagues Combined"]
+temporadas = ["2022-2023"]
+
+logging.basicConfig(
+    filename="match_stats.log",
+    level=logging.ERROR,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def ids_partidas_disputadas(fbref):
+    """
+    game_id de todas as partidas do calendário que já têm relatório no FBref.
+    É a única leitura do calendário que pode atualizá-lo; as leituras das
+    partidas reaproveitam o arquivo em cache.
+    """
+    with etapa("fbref_read_schedule"):
+        calendario = fbref.read_schedule()
+    if "match_report" in calendario.columns:
+        calendario = calendario[calendario["match_report"].notna()]
+    return calendario["game_id"].dropna().astype(str).unique().tolist()
+
+
+def _partida_salva(liga, temporada, stat_type, game_id, raiz=PASTA_DATASET):
+    pasta = caminho_particao(raiz, fonte=FONTE, liga=liga, temporada=temporada, stat_type=stat_type)
+    return (pasta / f"{game_id}.parquet").exists()
+
+
+def _ler_partidas(fbref, stat_type, game_ids):
+    """
+    Estatísticas das partidas pedidas, por game_id. O calendário já foi lido
+    nesta execução, então a leitura usa force_cache=True e não o baixa de novo.
+    """
+    with etapa("fbref_read_player_match_stats"):
+        df = fbref.read_player_match_stats(stat_type=stat_type, match_id=list(game_ids), force_cache=True)
+    return dict(tuple(df.groupby("game_id", sort=False)))
+
+
+def _ler_lote(fbref, stat_type, lote):
+    """
+    Lê um lote de partidas de uma vez; se o lote falhar, tenta cada partida
+    sozinha para que uma partida com problema não derrube as demais.
+    Devolve (tabelas por game_id, {game_id: erro}).
+    """
+    try:
+        return _ler_partidas(fbref, stat_type, lote), {}
+    except Exception:
+        if len(lote) == 1:
+            raise
+    tabelas, erros = {}, {}
+    for game_id in lote:
+        try:
+            tabelas.update(_ler_partidas(fbref, stat_type, [game_id]))
+        except Exception as e:
+            erros[game_id] = e
+    return tabelas, erros
+
+
+def coletar_partidas_jogadores(liga, temporada, stat_type="summary", caminho_checkpoint=CAMINHO_CHECKPOINT,
+                               tamanho_lote=TAMANHO_LOTE, raiz=PASTA_DATASET):
+    """
+    Coleta as estatísticas de jogadores das partidas e grava cada uma como
+    um arquivo da partição (liga, temporada, stat_type). O calendário é lido
+    uma vez por liga/temporada e as partidas são pedidas em lotes de
+    `tamanho_lote`. O checkpoint guarda os game_id já gravados: uma nova
+    execução retoma de onde parou e só baixa partidas novas. Só um lote
+    fica em memória por vez. Retorna a lista de game_id que falharam.
+    """
+    fbref = FBref(leagues=[liga], seasons=[temporada])
+    checkpoint = carregar_manifesto(caminho_checkpoint)
+    concluidas = set(checkpoint.get(liga, {}).get(temporada, {}).get(stat_type, []))
+
+    pendentes = [
+        game_id for game_id in ids_partidas_disputadas(fbref)
+        if game_id not in concluidas or not _partida_salva(liga, temporada, stat_type, game_id, raiz)
+    ]
+    print(f"{liga} {temporada} ({stat_type}): {len(concluidas)} partidas já coletadas, {len(pendentes)} pendentes.")
+
+    falhas = []
+    for inicio in range(0, len(pendentes), tamanho_lote):
+        lote = pendentes[inicio:inicio + tamanho_lote]
+        try:
+            tabelas, erros = _ler_lote(fbref, stat_type, lote)
+        except Exception as e:
+            tabelas, erros = {}, {lote[0]: e}
+
+        for game_id in lote:
+            df = tabelas.get(game_id)
+            if df is None:
+                erro = erros.get(game_id, "nenhuma estatística encontrada")
+                msg = f"Erro na partida {game_id} ({liga} {temporada}, {stat_type}): {erro}"
+                print(f"  {msg}")
+                logging.error(msg)
+                contar("partidas_com_falha")
+                falhas.append(game_id)
+                continue
+            df = tipar_fbref(df, stat_type)
+            salvar_dataset(df, FONTE, liga, temporada, stat_type, raiz=raiz, nome_parte=game_id)
+            contar("partidas_coletadas")
+            concluidas.add(game_id)
+
+        del tabelas
+        checkpoint.setdefault(liga, {}).setdefault(temporada, {})[stat_type] = sorted(concluidas)
+        salvar_manifesto(checkpoint, caminho_checkpoint)
+        print(f"  [{min(inicio + tamanho_lote, len(pendentes))}/{len(pendentes)}] partidas processadas.")
+
+    return falhas
+
+
+def coletar(ligas=ligas, temporadas=temporadas, stat_type="summary"):
+    """Coleta cada liga/temporada; devolve os game_id que falharam em todas."""
+    falhas = []
+    for liga in ligas:
+        for temporada in temporadas:
+            falhas += coletar_partidas_jogadores(liga, temporada, stat_type)
+    return falhas
+
+
+if __name__ == "__main__":
+    falhas = coletar()
+    if falhas:
+        print(f"{len(falhas)} partidas falharam e serão tentadas na próxima execução.")
+    telemetria.salvar_relatorio("estatisticas_jogadores_partida")
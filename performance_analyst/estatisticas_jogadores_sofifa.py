@@ -1,36 +1,77 @@
 import os
 import pandas as pd
 from soccerdata import SoFIFA
+from armazenamento_parquet import PASTA_DATASET, compactar_tipos, salvar_dataset
+from manifesto_coleta import carregar_manifesto, salvar_manifesto
+from telemetria import contar, etapa, telemetria
 
-# 1. Coletar as últimas 100 versões
-print(" Buscando últimas versões do SoFIFA...")
-sofifa = SoFIFA(versions="all")
-df_versions = sofifa.read_versions().reset_index()
-df_versions["update"] = pd.to_datetime(df_versions["update"], errors="coerce")
-df_versions = df_versions[df_versions["update"].notna()]
-ultimas_100 = df_versions.sort_values("update").tail(100)
-lista_versions = ultimas_100["version_id"].tolist()
-
-# 2. Reinstanciar com as 100 últimas versões
-print(" Coletando dados de jogadores das últimas 100 versões...")
-sofifa = SoFIFA(versions=lista_versions)
-df_jogadores = sofifa.read_players()
-
-# 3. Criar pasta principal
-output_dir = "data_sofifa_jogadores"
-os.makedirs(output_dir, exist_ok=True)
-
-# 4. Verificar se coluna de nacionalidade existe
-if "nationality_name" not in df_jogadores.columns:
-    raise KeyError("A coluna 'nationality_name' não foi encontrada no DataFrame.")
-
-# 5. Separar e salvar por nacionalidade
-print(" Salvando dados por nacionalidade...")
-for nacionalidade, df_nac in df_jogadores.groupby("nationality_name"):
-    nome_pasta = os.path.join(output_dir, nacionalidade.replace(" ", "_"))
-    os.makedirs(nome_pasta, exist_ok=True)
-
-    caminho_arquivo = os.path.join(nome_pasta, f"jogadores_{nacionalidade.replace(' ', '_')}.csv")
-    df_nac.to_csv(caminho_arquivo, index=False)
-
-print(" Finalizado! Dados salvos em: data_sofifa_jogadores/")
+# Partições: fonte=sofifa_jogadores/liga=<nacionalidade>/temporada=<version_id>/stat_type=jogadores
+FONTE = "sofifa_jogadores"
+COLUNA_NACIONALIDADE = "nationality_name"
+CAMINHO_CHECKPOINT = os.path.join(PASTA_DATASET, "checkpoint_sofifa_versoes.json")
+
+
+def ultimas_versoes(quantidade=100):
+    """version_id das últimas versões do SoFIFA, da mais antiga para a mais recente."""
+    sofifa = SoFIFA(versions="all")
+    df_versions = sofifa.read_versions().reset_index()
+    df_versions["update"] = pd.to_datetime(df_versions["update"], errors="coerce")
+    df_versions = df_versions[df_versions["update"].notna()]
+    return df_versions.sort_values("update").tail(quantidade)["version_id"].tolist()
+
+
+def coletar_versao(version_id, raiz=PASTA_DATASET):
+    """
+    Lê os jogadores de uma única versão e grava uma partição por
+    nacionalidade. Só essa versão fica em memória, já com tipos compactos.
+    """
+    with etapa("sofifa_read_players"):
+        df_jogadores = SoFIFA(versions=[version_id]).read_players().reset_index()
+    contar("sofifa_jogadores", len(df_jogadores))
+
+    if COLUNA_NACIONALIDADE not in df_jogadores.columns:
+        raise KeyError(f"A coluna '{COLUNA_NACIONALIDADE}' não foi encontrada no DataFrame.")
+
+    df_jogadores = compactar_tipos(df_jogadores)
+    df_jogadores[COLUNA_NACIONALIDADE] = df_jogadores[COLUNA_NACIONALIDADE].astype("category")
+
+    for nacionalidade, df_nac in df_jogadores.groupby(COLUNA_NACIONALIDADE, observed=True):
+        salvar_dataset(df_nac, FONTE, nacionalidade.replace(" ", "_"), version_id, "jogadores", raiz=raiz)
+    return df_jogadores[COLUNA_NACIONALIDADE].nunique()
+
+
+def coletar_versoes(versoes, caminho_checkpoint=CAMINHO_CHECKPOINT, raiz=PASTA_DATASET):
+    """
+    Processa as versões uma de cada vez, pulando as que já estão no
+    checkpoint. Uma versão nova custa apenas a coleta dela mesma.
+    """
+    checkpoint = carregar_manifesto(caminho_checkpoint)
+    concluidas = set(checkpoint.get("versoes", []))
+    pendentes = [v for v in versoes if v not in concluidas]
+    print(f" {len(concluidas)} versões já coletadas, {len(pendentes)} pendentes.")
+
+    for i, version_id in enumerate(pendentes, start=1):
+        print(f" [{i}/{len(pendentes)}] Coletando versão {version_id}...")
+        nacionalidades = coletar_versao(version_id, raiz)
+
+        concluidas.add(version_id)
+        checkpoint["versoes"] = sorted(concluidas)
+        salvar_manifesto(checkpoint, caminho_checkpoint)
+        print(f"   Versão {version_id} salva ({nacionalidades} nacionalidades).")
+
+
+def coletar(quantidade=100):
+    # 1. Coletar as últimas versões
+    print(" Buscando últimas versões do SoFIFA...")
+    lista_versions = ultimas_versoes(quantidade)
+
+    # 2. Coletar versão a versão, retomando do checkpoint
+    print(f" Coletando dados de jogadores das últimas {quantidade} versões...")
+    coletar_versoes(lista_versions)
+
+    print(f" Finalizado! Dados salvos em: {PASTA_DATASET}/fonte={FONTE}/")
+
+
+if __name__ == "__main__":
+    coletar(100)
+    telemetria.salvar_relatorio("estatisticas_jogadores_sofifa")
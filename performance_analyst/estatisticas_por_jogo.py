@@ -1,8 +1,9 @@
-import os
 import logging
-from pathlib import Path
-import pandas as pd
-from soccerdata import FBref
+from armazenamento_raw_data import FBrefRegistrado, LojaRawData, ler_com_cache
+from armazenamento_parquet import salvar_dataset
+from esquemas_fbref import EsquemaFBref
+from estatisticas_jogadores import dividir_por_liga
+from telemetria import contar, telemetria
 
 # Configuração de logging
 logging.basicConfig(
@@ -11,43 +12,9 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-# Tradução das colunas
-traducao_colunas = {
-    ('players_used', ''): 'Jogadores Utilizados',
-    ('Age', ''): 'Idade Média',
-    ('Poss', ''): 'Posse (%)',
-    ('Playing Time', 'MP'): 'Partidas',
-    ('Playing Time', 'Starts'): 'Titularidades',
-    ('Playing Time', 'Min'): 'Minutos Jogados',
-    ('Playing Time', '90s'): 'Jogos (90min)',
-    ('Performance', 'Gls'): 'Gols',
-    ('Performance', 'Ast'): 'Assistências',
-    ('Performance', 'G+A'): 'Gols+Assistências',
-    ('Performance', 'G-PK'): 'Gols sem Pênalti',
-    ('Performance', 'PK'): 'Pênaltis Convertidos',
-    ('Performance', 'PKatt'): 'Pênaltis Tentados',
-    ('Performance', 'CrdY'): 'Cartões Amarelos',
-    ('Performance', 'CrdR'): 'Cartões Vermelhos',
-    ('Expected', 'xG'): 'xG',
-    ('Expected', 'npxG'): 'xG (sem pênalti)',
-    ('Expected', 'xAG'): 'xAG',
-    ('Expected', 'npxG+xAG'): 'npxG+xAG',
-    ('Progression', 'PrgC'): 'Conduções Progressivas',
-    ('Progression', 'PrgP'): 'Passes Progressivos',
-    ('Per 90 Minutes', 'Gls'): 'Gols/90min',
-    ('Per 90 Minutes', 'Ast'): 'Assist/90min',
-    ('Per 90 Minutes', 'G+A'): 'G+A/90min',
-    ('Per 90 Minutes', 'G-PK'): 'Gols SP/90min',
-    ('Per 90 Minutes', 'G+A-PK'): 'G+A SP/90min',
-    ('Per 90 Minutes', 'xG'): 'xG/90min',
-    ('Per 90 Minutes', 'xAG'): 'xAG/90min',
-    ('Per 90 Minutes', 'xG+xAG'): 'xG+xAG/90min',
-    ('Per 90 Minutes', 'npxG'): 'npxG/90min',
-    ('Per 90 Minutes', 'npxG+xAG'): 'npxG+xAG/90min',
-    ('url', ''): 'URL'
-}
-
-colunas_desejadas = list(traducao_colunas.keys())
+# Fonte própria no dataset: não se mistura com as tabelas de ligas.py em fonte=fbref_ligas
+FONTE = "fbref_padrao_traduzido"
+STAT_TYPE = "padrao"
 
 # Ligas e temporadas
 ligas = [
@@ -60,45 +27,46 @@ temporadas = [
     '2024-2025', '2025-2026', '2026-2027'
 ]
 
-# Instanciando FBref
-fbref = FBref()
 
+def traduzir_colunas(df):
+    """Mantém só as colunas traduzidas do stat_type standard, com os nomes em português e tipos compactos."""
+    return EsquemaFBref("standard").traduzir(df)
 
-# Pasta base
-pasta_base = Path("dados_ligas")
-pasta_base.mkdir(exist_ok=True)
 
-# Início da coleta
-for liga in ligas:
-    print(f"\n Iniciando coleta para a liga: {liga}")
-    pasta_liga = pasta_base / liga
-    pasta_liga.mkdir(parents=True, exist_ok=True)
+def coletar(ligas=ligas, temporadas=temporadas):
+    """Coleta e traduz a tabela padrão de cada liga/temporada; devolve as que falharam."""
+    # Páginas compactadas e tabelas já extraídas, para não reanalisar o HTML
+    loja = LojaRawData()
 
-    for temporada in temporadas:
-        try:
-            print(f" Temporada: {temporada}")
-            fbref = FBref(leagues=liga, seasons=temporada)
-            df = fbref.read_team_season_stats(stat_type='standard')
+    falhas = []
+    for liga in ligas:
+        print(f"\n Iniciando coleta para a liga: {liga}")
 
+        for temporada in temporadas:
+            try:
+                print(f" Temporada: {temporada}")
+                fbref = FBrefRegistrado(leagues=liga, seasons=temporada)
+                df = ler_com_cache(fbref, "read_team_season_stats", loja=loja, stat_type='standard')
 
+                # Verificar quais colunas estão disponíveis e traduzir
+                df_filtrado = traduzir_colunas(df)
 
-            # Verificar quais colunas estão disponíveis
-            colunas_validas = [col for col in colunas_desejadas if col in df.columns]
+                # Uma partição Parquet por liga real (mantém liga/temporada/time do índice)
+                for liga_linha, df_liga in dividir_por_liga(df_filtrado, liga):
+                    caminho_arquivo, _ = salvar_dataset(df_liga, FONTE, liga_linha, temporada, STAT_TYPE)
+                    print(f"  Dados salvos em: {caminho_arquivo}")
 
-            if not colunas_validas:
-                raise ValueError("Nenhuma das colunas desejadas está disponível.")
+            except Exception as e:
+                msg = f"Erro ao coletar dados da temporada {temporada} da liga {liga}: {e}"
+                print(f"  {msg}")
+                logging.error(msg)
+                contar("temporadas_com_falha")
+                falhas.append((liga, temporada))
 
-            df_filtrado = df[colunas_validas]
-            df_filtrado.columns = [traducao_colunas[col] for col in colunas_validas]
+    print("\n Coleta finalizada para todas as ligas.")
+    return falhas
 
-            # Salvar CSV
-            caminho_arquivo = pasta_liga / f"{temporada}.csv"
-            df_filtrado.to_csv(caminho_arquivo, index=False, encoding="utf-8-sig")
-            print(f"  Dados salvos em: {caminho_arquivo}")
 
-        except Exception as e:
-            msg = f"Erro ao coletar dados da temporada {temporada} da liga {liga}: {e}"
-            print(f"  {msg}")
-            logging.error(msg)
-
-print("\n Coleta finalizada para todas as ligas.")
+if __name__ == "__main__":
+    coletar()
+    telemetria.salvar_relatorio("estatisticas_por_jogo")
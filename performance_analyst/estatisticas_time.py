@@ -1,6 +1,7 @@
 import os
-import pandas as pd
-from soccerdata import FBref
+import sys
+from motor_coleta_fbref import Tarefa, executar_tarefas, salvar_relatorio, tarefas_com_falha
+from telemetria import telemetria
 
 #  Parâmetros
 ligas = ["Big 5 European Leagues Combined"]
@@ -22,28 +23,29 @@ estatisticas = {
     "keeper_adv": "goleiro_avancado"
 }
 
-#  Pasta de saída
-base_path = "dados_times"
-
-#  Loop pelas ligas e temporadas
-for liga in ligas:
-    for temporada in temporadas:
-        print(f"\n Temporada: {temporada}")
-        fbref = FBref(leagues=[liga], seasons=[temporada])
-        
-        for tipo, nome_arquivo in estatisticas.items():
-            try:
-                print(f" Coletando {tipo}...")
-                df = fbref.read_team_season_stats(stat_type=tipo)
-                
-                #  Cria pasta da temporada
-                caminho_pasta = os.path.join(base_path, liga, temporada)
-                os.makedirs(caminho_pasta, exist_ok=True)
-
-                #  Salva CSV
-                caminho_arquivo = os.path.join(caminho_pasta, f"{nome_arquivo}.csv")
-                df.to_csv(caminho_arquivo, index=False)
-                print(f" Salvo: {caminho_arquivo}")
-            
-            except Exception as e:
-                print(f" Erro ao coletar {tipo} - {liga} {temporada}: {e}")
+CAMINHO_RELATORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "relatorio_coleta_times.json")
+
+
+def montar_tarefas(ligas=ligas, temporadas=temporadas):
+    """Uma tarefa por (liga, temporada, stat_type), cada uma gravando uma partição Parquet."""
+    return [
+        Tarefa(liga, temporada, "read_team_season_stats", {"stat_type": tipo}, "fbref_times", nome_arquivo)
+        for liga in ligas
+        for temporada in temporadas
+        for tipo, nome_arquivo in estatisticas.items()
+    ]
+
+
+def coletar(ligas=ligas, temporadas=temporadas, apenas_falhas=False):
+    """Executa as tarefas (ou só as que falharam na última execução) e grava o relatório."""
+    tarefas = tarefas_com_falha(CAMINHO_RELATORIO) if apenas_falhas else montar_tarefas(ligas, temporadas)
+    print(f" Coletando estatísticas de times: {len(tarefas)} tarefas")
+    relatorio = executar_tarefas(tarefas)
+    salvar_relatorio(relatorio, CAMINHO_RELATORIO)
+    return relatorio
+
+
+if __name__ == "__main__":
+    #  Com --falhas, reexecuta só as tarefas que falharam na última execução
+    coletar(apenas_falhas="--falhas" in sys.argv)
+    telemetria.salvar_relatorio("estatisticas_time")
@@ -0,0 +1,382 @@
+import os
+import sys
+from pathlib import Path
+from urllib.parse import unquote
+
+import pandas as pd
+
+from armazenamento_parquet import PASTA_DATASET, caminho_particao, carregar_dataset, listar_arquivos, salvar_dataset
+from esquemas_football_data import RegistroEsquemas, ler_csv_tipado
+from manifesto_coleta import carregar_manifesto, hash_arquivo, salvar_manifesto
+from telemetria import contar, etapa, telemetria
+
+RAIZ_REPO = Path(__file__).resolve().parent.parent
+PASTA_FOOTBALL_DATA = RAIZ_REPO / "dados_coletados_football_data_org"
+PASTA_POWERBI = os.getenv("PASTA_POWERBI", str(RAIZ_REPO / "powerbi"))
+NOME_ESTADO = "estado_exportacao.json"
+
+# Dimensão -> (chave substituta, colunas da chave natural)
+DIMENSOES = {
+    "dim_competicao": ("competicao_key", ["origem", "id_origem"]),
+    "dim_temporada": ("temporada_key", ["ano_inicio"]),
+    "dim_time": ("time_key", ["origem", "id_origem"]),
+    "dim_jogador": ("jogador_key", ["origem", "id_origem"]),
+}
+
+# Dtype das chaves (substitutas e data_key) em todas as partições e
+# dimensões: compactadas por partição, viriam Int8 numa e Int16 noutra
+TIPO_CHAVE = "Int32"
+
+# Dtype fixo das demais colunas conhecidas dos fatos e dimensões. Sem ele, a
+# mesma coluna mudaria de tipo entre partições (Int8/Int16 pelos valores, ou
+# texto numa temporada em que veio toda vazia) e o Power BI não combina a pasta
+TIPOS_COLUNAS = {
+    # fato_partidas
+    "id": "Int64", "utcDate": "datetime64[ns, UTC]", "lastUpdated": "datetime64[ns, UTC]",
+    "status": "string", "matchday": "Int32", "stage": "string", "group": "string",
+    "score_winner": "string", "score_duration": "string",
+    "score_fullTime_home": "Int32", "score_fullTime_away": "Int32",
+    "score_halfTime_home": "Int32", "score_halfTime_away": "Int32",
+    # fato_artilheiros
+    "playedMatches": "Int32", "goals": "Int32", "assists": "Int32", "penalties": "Int32",
+    # dimensões
+    "origem": "string", "id_origem": "string", "nome": "string", "nome_curto": "string", "sigla": "string",
+    "escudo": "string", "tipo": "string", "area": "string", "emblema": "string", "nacionalidade": "string",
+    "data_nascimento": "string", "posicao": "string", "ano_nascimento": "Int32", "ano_inicio": "Int32",
+    "data": "datetime64[ns]", "ano": "Int32", "trimestre": "Int32", "mes": "Int32", "dia": "Int32",
+    "dia_semana": "Int32",
+}
+
+# Colunas acrescentadas por carregar_dataset a partir do caminho das partições
+COLUNAS_PARTICAO = ["fonte", "liga", "temporada", "stat_type"]
+
+# Colunas das partidas que ficam no fato; nomes, escudos e competição vão para as dimensões
+COLUNAS_FATO_PARTIDAS = [
+    "id", "utcDate", "status", "matchday", "stage", "group", "lastUpdated", "score_winner", "score_duration",
+    "score_fullTime_home", "score_fullTime_away", "score_halfTime_home", "score_halfTime_away",
+]
+COLUNAS_FATO_ARTILHEIROS = ["playedMatches", "goals", "assists", "penalties"]
+
+
+def _coluna(df, nome):
+    """Coluna do DataFrame, ou uma coluna vazia se a resposta não a trouxe."""
+    return df[nome] if nome in df.columns else pd.Series(pd.NA, index=df.index, dtype="object")
+
+
+def _ids(serie):
+    """Ids numéricos da API como texto ('1769', não '1769.0'), para servirem de chave natural."""
+    return pd.to_numeric(serie, errors="coerce").astype("Int64").astype("string")
+
+
+def _tipo_fixo(coluna, serie):
+    """Dtype da coluna em todas as partições: o conhecido, ou o mais largo do seu tipo (estatísticas do FBref)."""
+    if str(coluna).endswith("_key"):
+        return TIPO_CHAVE
+    if coluna in TIPOS_COLUNAS:
+        return TIPOS_COLUNAS[coluna]
+    if pd.api.types.is_bool_dtype(serie):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(serie):
+        return "Int64"
+    if pd.api.types.is_float_dtype(serie):
+        return "float64"
+    if isinstance(serie.dtype, pd.DatetimeTZDtype):
+        return "datetime64[ns, UTC]"
+    if pd.api.types.is_datetime64_dtype(serie):
+        return "datetime64[ns]"
+    return "string"
+
+
+def tipar_colunas(df):
+    """
+    Converte cada coluna para o seu dtype fixo e devolve (df, tipos), com
+    `tipos` pronto para salvar_dataset não compactar nenhuma coluna.
+    """
+    df = df.copy()
+    tipos = {}
+    for coluna in df.columns:
+        tipo = tipos[coluna] = _tipo_fixo(coluna, df[coluna])
+        if tipo.startswith("datetime64[ns, UTC]"):
+            df[coluna] = pd.to_datetime(df[coluna], utc=True, errors="coerce")
+        elif tipo.startswith("datetime64"):
+            df[coluna] = pd.to_datetime(df[coluna], errors="coerce")
+        elif tipo.startswith(("Int", "float")):
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce")
+        df[coluna] = df[coluna].astype(tipo)
+    return df, tipos
+
+
+def _valor_particao(caminho, chave):
+    """Valor de uma partição Hive no caminho do arquivo: 'temporada=2022-2023' -> '2022-2023'."""
+    for parte in Path(caminho).parts:
+        if parte.startswith(f"{chave}="):
+            return unquote(parte.split("=", 1)[1])
+    return None
+
+
+def _ano_particao(caminho):
+    """Ano de início da temporada da partição: '2022-2023' -> 2022."""
+    return int(_valor_particao(caminho, "temporada")[:4])
+
+
+def _por_ano(arquivos, ano_do_arquivo):
+    particoes = {}
+    for arquivo in arquivos:
+        particoes.setdefault(ano_do_arquivo(arquivo), []).append(arquivo)
+    return particoes
+
+
+# Descoberta das partições de cada fato: ano de início -> arquivos de entrada
+
+def particoes_partidas():
+    arquivos = sorted(PASTA_FOOTBALL_DATA.glob("partidas_competicao/*/*/partidas_*.csv"))
+    return _por_ano(arquivos, lambda a: int(a.parent.name))
+
+
+def particoes_artilheiros():
+    arquivos = sorted(PASTA_FOOTBALL_DATA.glob("artilheiros/*/*/artilheiros_*.csv"))
+    return _por_ano(arquivos, lambda a: int(a.parent.name))
+
+
+def particoes_times():
+    return _por_ano(listar_arquivos(PASTA_DATASET, fonte="fbref_times"), _ano_particao)
+
+
+def particoes_jogadores():
+    return _por_ano(listar_arquivos(PASTA_DATASET, fonte="fbref_jogadores_larga"), _ano_particao)
+
+
+class ModeloEstrela:
+    """
+    Modelo estrela para o Power BI: dimensões com chaves substitutas
+    inteiras e fatos particionados por temporada (ano de início), gravados
+    no formato do dataset Parquet em PASTA_POWERBI.
+
+    As chaves de um membro nunca mudam: as dimensões já exportadas são
+    relidas e só os membros novos recebem chaves, a partir da maior
+    existente. Por isso uma partição de fato cujas entradas não mudaram
+    (mesmo hash registrado em estado_exportacao.json) não é reconstruída.
+    """
+
+    def __init__(self, raiz=PASTA_POWERBI):
+        self.raiz = raiz
+        self.caminho_estado = os.path.join(raiz, NOME_ESTADO)
+        self.estado = carregar_manifesto(self.caminho_estado)
+        self.dimensoes = {nome: self._carregar_dimensao(nome) for nome in list(DIMENSOES) + ["dim_data"]}
+        self.datas = []
+        registro = RegistroEsquemas()
+        self.esquema_partidas = registro.esquema("/competitions/{id}/matches [unfold]")
+        self.esquema_artilheiros = registro.esquema("/competitions/{id}/scorers")
+
+    def _carregar_dimensao(self, nome):
+        df = carregar_dataset(fonte=nome, raiz=self.raiz, restaurar_estrutura=False)
+        df = df.drop(columns=COLUNAS_PARTICAO, errors="ignore")
+        for coluna in df.select_dtypes("category").columns:
+            df[coluna] = df[coluna].astype("object")
+        return df
+
+    # Dimensões
+
+    def chaves(self, nome, membros):
+        """
+        Chave substituta de cada linha de `membros` (colunas da chave natural
+        mais atributos). Membros novos são acrescentados à dimensão e os
+        atributos dos existentes passam a ser os mais recentes.
+        """
+        chave, naturais = DIMENSOES[nome]
+        validos = membros.dropna(subset=naturais).drop_duplicates(subset=naturais, keep="last")
+        dimensao = self.dimensoes[nome]
+
+        if dimensao.empty:
+            combinada = validos.set_index(naturais)
+            combinada[chave] = pd.NA
+        else:
+            combinada = validos.set_index(naturais).combine_first(dimensao.set_index(naturais))
+        novos = combinada[chave].isna()
+        inicio = int(dimensao[chave].max()) + 1 if not dimensao.empty else 1
+        combinada.loc[novos, chave] = range(inicio, inicio + int(novos.sum()))
+        contar(f"powerbi_{nome}_novos", int(novos.sum()))
+
+        combinada[chave] = combinada[chave].astype("int64")
+        atributos = [c for c in list(validos.columns) + list(dimensao.columns) if c not in naturais and c != chave]
+        self.dimensoes[nome] = combinada.reset_index()[[chave] + naturais + list(dict.fromkeys(atributos))]
+
+        mapa = self.dimensoes[nome][naturais + [chave]]
+        return membros[naturais].merge(mapa, on=naturais, how="left")[chave].astype("Int64").set_axis(membros.index)
+
+    def chave_temporada(self, ano):
+        return int(self.chaves("dim_temporada", pd.DataFrame({"ano_inicio": [ano]})).iloc[0])
+
+    def dimensao_data(self):
+        """Calendário contínuo cobrindo todas as datas dos fatos, com chave AAAAMMDD."""
+        datas = pd.Series(dtype="datetime64[ns]")
+        if self.datas:
+            datas = pd.to_datetime(pd.concat(self.datas), utc=True).dt.tz_localize(None).dt.normalize()
+        anterior = self.dimensoes["dim_data"]
+        if not anterior.empty:
+            datas = pd.concat([datas, pd.to_datetime(anterior["data"])])
+        datas = datas.dropna()
+        if datas.empty:
+            return anterior
+        calendario = pd.DataFrame({"data": pd.date_range(datas.min(), datas.max(), freq="D")})
+        calendario.insert(0, "data_key", calendario["data"].dt.strftime("%Y%m%d").astype("int32"))
+        calendario["ano"] = calendario["data"].dt.year
+        calendario["trimestre"] = calendario["data"].dt.quarter
+        calendario["mes"] = calendario["data"].dt.month
+        calendario["dia"] = calendario["data"].dt.day
+        calendario["dia_semana"] = calendario["data"].dt.dayofweek
+        return calendario
+
+    # Fatos
+
+    def _times_fd(self, df, prefixo, sep):
+        membros = pd.DataFrame({
+            "origem": "football_data",
+            "id_origem": _ids(_coluna(df, f"{prefixo}{sep}id")),
+            "nome": _coluna(df, f"{prefixo}{sep}name"),
+            "nome_curto": _coluna(df, f"{prefixo}{sep}shortName"),
+            "sigla": _coluna(df, f"{prefixo}{sep}tla"),
+            "escudo": _coluna(df, f"{prefixo}{sep}crest"),
+        })
+        return self.chaves("dim_time", membros)
+
+    def fato_partidas(self, arquivos, ano):
+        df = pd.concat(
+            [ler_csv_tipado(a, self.esquema_partidas, sep="_", encoding="utf-8-sig") for a in arquivos],
+            ignore_index=True,
+        )
+        competicoes = pd.DataFrame({
+            "origem": "football_data",
+            "id_origem": _coluna(df, "competition_code").astype("string"),
+            "nome": _coluna(df, "competition_name"),
+            "tipo": _coluna(df, "competition_type"),
+            "area": _coluna(df, "area_name"),
+            "emblema": _coluna(df, "competition_emblem"),
+        })
+        data_hora = pd.to_datetime(_coluna(df, "utcDate"), utc=True, errors="coerce")
+        self.datas.append(data_hora)
+
+        fato = df[[c for c in COLUNAS_FATO_PARTIDAS if c in df.columns]].copy()
+        if "utcDate" in fato.columns:
+            fato["utcDate"] = data_hora
+        fato.insert(1, "data_key", pd.to_numeric(data_hora.dt.strftime("%Y%m%d"), errors="coerce").astype("Int32"))
+        fato.insert(2, "competicao_key", self.chaves("dim_competicao", competicoes))
+        fato.insert(3, "temporada_key", self.chave_temporada(ano))
+        fato.insert(4, "time_casa_key", self._times_fd(df, "homeTeam", "_"))
+        fato.insert(5, "time_fora_key", self._times_fd(df, "awayTeam", "_"))
+        return fato
+
+    def fato_artilheiros(self, arquivos, ano):
+        df = pd.concat(
+            [ler_csv_tipado(a, self.esquema_artilheiros, encoding="utf-8-sig") for a in arquivos],
+            ignore_index=True,
+        )
+        competicoes = pd.DataFrame({
+            "origem": "football_data",
+            "id_origem": _coluna(df, "competition_code").astype("string"),
+            "nome": _coluna(df, "competition_name"),
+        })
+        jogadores = pd.DataFrame({
+            "origem": "football_data",
+            "id_origem": _ids(_coluna(df, "player.id")),
+            "nome": _coluna(df, "player.name"),
+            "nacionalidade": _coluna(df, "player.nationality"),
+            "data_nascimento": _coluna(df, "player.dateOfBirth"),
+            "posicao": _coluna(df, "player.section"),
+        })
+
+        fato = df[[c for c in COLUNAS_FATO_ARTILHEIROS if c in df.columns]].copy()
+        fato.insert(0, "competicao_key", self.chaves("dim_competicao", competicoes))
+        fato.insert(1, "temporada_key", self.chave_temporada(ano))
+        fato.insert(2, "jogador_key", self.chaves("dim_jogador", jogadores))
+        fato.insert(3, "time_key", self._times_fd(df, "team", "."))
+        return fato
+
+    def _chaves_fbref(self, df, ano):
+        """competicao_key, temporada_key e time_key de uma tabela do FBref (colunas league e team)."""
+        chaves = pd.DataFrame(index=df.index)
+        chaves["competicao_key"] = self.chaves("dim_competicao", pd.DataFrame({
+            "origem": "fbref", "id_origem": df["league"].astype("string"), "nome": df["league"],
+        }))
+        chaves["temporada_key"] = self.chave_temporada(ano)
+        chaves["time_key"] = self.chaves("dim_time", pd.DataFrame({
+            "origem": "fbref", "id_origem": df["team"].astype("string"), "nome": df["team"],
+        }))
+        return chaves
+
+    def fato_times_temporada(self, arquivos, ano):
+        """Todos os stat_types de times da temporada lado a lado, com o stat_type como prefixo."""
+        por_stat_type = {}
+        for arquivo in arquivos:
+            # Uma partição por liga: as ligas de um stat_type se empilham, os stat_types ficam lado a lado
+            por_stat_type.setdefault(_valor_particao(arquivo, "stat_type"), []).append(pd.read_parquet(arquivo))
+        tabelas = []
+        for stat_type, partes in por_stat_type.items():
+            df = pd.concat(partes, ignore_index=True).drop(columns=["season"], errors="ignore")
+            df = df.drop_duplicates(subset=["league", "team"]).set_index(["league", "team"])
+            tabelas.append(df.add_prefix(f"{stat_type}_"))
+        df = pd.concat(tabelas, axis=1).reset_index()
+        return pd.concat([self._chaves_fbref(df, ano), df.drop(columns=["league", "team"])], axis=1)
+
+    def fato_jogadores_temporada(self, arquivos, ano):
+        df = pd.concat([pd.read_parquet(a) for a in arquivos], ignore_index=True).drop(columns=["season"], errors="ignore")
+        jogadores = pd.DataFrame({
+            "origem": "fbref",
+            "id_origem": df["player"].astype("string"),
+            "nome": df["player"],
+            "nacionalidade": _coluna(df, "nation"),
+            "ano_nascimento": _coluna(df, "born"),
+        })
+        chaves = self._chaves_fbref(df, ano)
+        chaves.insert(2, "jogador_key", self.chaves("dim_jogador", jogadores))
+        return pd.concat([chaves, df.drop(columns=["league", "team", "player", "nation", "born"], errors="ignore")], axis=1)
+
+    # Exportação
+
+    def exportar(self, forcar=False):
+        """
+        Reconstrói só as partições de fato cujas entradas mudaram desde a
+        última exportação (ou todas, com forcar=True) e regrava as dimensões
+        que ganharam membros. Retorna {tabela: [anos regravados]}.
+        """
+        fatos = [
+            ("fato_partidas", particoes_partidas, self.fato_partidas),
+            ("fato_artilheiros", particoes_artilheiros, self.fato_artilheiros),
+            ("fato_times_temporada", particoes_times, self.fato_times_temporada),
+            ("fato_jogadores_temporada", particoes_jogadores, self.fato_jogadores_temporada),
+        ]
+        regravadas = {}
+        for tabela, particoes, construir in fatos:
+            for ano, arquivos in sorted(particoes().items()):
+                assinatura = {os.path.relpath(a, RAIZ_REPO): hash_arquivo(a) for a in arquivos}
+                destino = caminho_particao(self.raiz, fonte=tabela, temporada=ano)
+                if not forcar and self.estado.get(tabela, {}).get(str(ano)) == assinatura and destino.exists():
+                    contar("powerbi_particoes_puladas")
+                    continue
+
+                with etapa(f"powerbi_{tabela}"):
+                    df, tipos = tipar_colunas(construir(arquivos, ano))
+                caminho, alterado = salvar_dataset(df, tabela, None, ano, None, raiz=self.raiz, tipos=tipos)
+                self.estado.setdefault(tabela, {})[str(ano)] = assinatura
+                regravadas.setdefault(tabela, []).append(ano)
+                contar("powerbi_particoes_regravadas")
+                print(f"{'Salvo' if alterado else 'Sem alterações'}: {caminho} ({len(df)} linhas)")
+
+        self.dimensoes["dim_data"] = self.dimensao_data()
+        for nome, df in self.dimensoes.items():
+            if not df.empty:
+                df, tipos = tipar_colunas(df)
+                caminho, alterado = salvar_dataset(df, nome, None, None, None, raiz=self.raiz, tipos=tipos)
+                if alterado:
+                    print(f"Salvo: {caminho} ({len(df)} linhas)")
+        salvar_manifesto(self.estado, self.caminho_estado)
+        return regravadas
+
+
+if __name__ == "__main__":
+    #  Com --forcar, reconstrói todas as partições mesmo sem mudanças nas entradas
+    regravadas = ModeloEstrela().exportar(forcar="--forcar" in sys.argv)
+    if not regravadas:
+        print("Nenhuma partição mudou desde a última exportação.")
+    print(f"Modelo estrela em: {PASTA_POWERBI}")
+    telemetria.salvar_relatorio("exportacao_powerbi")
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+from armazenamento_parquet import PASTA_DATASET, carregar_dataset, salvar_dataset
+from esquemas_fbref import tipar_fbref
+from estatisticas_jogadores import stat_types as STAT_TYPES
+
+FONTE_ORIGEM = "fbref_jogadores"
+FONTE_TABELA_LARGA = "fbref_jogadores_larga"
+
+CHAVES = ["league", "season", "team", "player"]
+
+# Colunas descritivas repetidas em todos os stat_types: mantidas uma vez, sem prefixo
+COLUNAS_DESCRITIVAS = ["nation", "pos", "age", "born", "90s"]
+
+# Trechos de nome que indicam taxa/média, que não devem ser divididos por 90s
+TRECHOS_NAO_CONTAGEM = ("%", "90", "/", "_Dist", "_Min")
+
+MINIMO_90S_PERCENTIL = 5.0
+
+
+def temporada_por_codigo(codigo):
+    """Inverso de codigo_temporada: '1617' -> '2016-2017'."""
+    inicio, fim = int(codigo[:2]), int(codigo[2:])
+    inicio += 1900 if inicio > 50 else 2000
+    fim += 1900 if fim > 50 else 2000
+    return f"{inicio}-{fim}"
+
+
+class PlayerSeasonStore:
+    """
+    Tabela única jogador-temporada com todos os stat_types do FBref unidos
+    por (league, season, team, player), mais colunas por 90 minutos e
+    percentis por temporada. Mantém índices hash (dicionário valor ->
+    posições) por jogador, time e temporada para buscas O(1).
+    """
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self._indices = {
+            coluna: self.df.groupby(coluna, observed=True, sort=False).indices
+            for coluna in ("player", "team", "season")
+        }
+
+    # Construção
+
+    @classmethod
+    def construir(cls, liga=None, temporadas=None, stat_types=STAT_TYPES, raiz=PASTA_DATASET):
+        """Une as partições de cada stat_type salvas por estatisticas_jogadores.py."""
+        tabelas = []
+        descritivas_vistas = set()
+        for stat_type in stat_types:
+            df = carregar_dataset(fonte=FONTE_ORIGEM, liga=liga, temporada=temporadas,
+                                  stat_type=stat_type, raiz=raiz, restaurar_estrutura=False)
+            if df.empty:
+                print(f"Aviso: nenhuma partição de {stat_type} encontrada.")
+                continue
+            df = df.drop(columns=["fonte", "liga", "temporada", "stat_type"], errors="ignore")
+            faltantes = [c for c in CHAVES if c not in df.columns]
+            if faltantes:
+                print(f"Aviso: partições de {stat_type} sem as colunas {', '.join(faltantes)}; stat_type ignorado.")
+                continue
+            # Linhas dos CSVs antigos, gravados sem o índice, não identificam o jogador
+            sem_chave = df[CHAVES].isna().any(axis=1)
+            if sem_chave.any():
+                print(f"Aviso: {sem_chave.sum()} linhas de {stat_type} sem {'/'.join(CHAVES)} ficaram de fora.")
+                df = df[~sem_chave]
+            df = tipar_fbref(df, stat_type)
+            df = cls.unir_duplicatas(df, stat_type).set_index(CHAVES)
+
+            descritivas = [c for c in COLUNAS_DESCRITIVAS if c in df.columns]
+            df = df.drop(columns=[c for c in descritivas if c in descritivas_vistas])
+            descritivas_vistas.update(descritivas)
+            df = df.rename(columns={c: f"{stat_type}_{c}" for c in df.columns if c not in COLUNAS_DESCRITIVAS})
+            tabelas.append(df)
+
+        if not tabelas:
+            return cls(pd.DataFrame(columns=CHAVES))
+
+        df = pd.concat(tabelas, axis=1, join="outer").reset_index()
+        df = cls.adicionar_por_90(df)
+        df = cls.adicionar_percentis(df)
+        return cls(df)
+
+    @classmethod
+    def unir_duplicatas(cls, df, stat_type):
+        """
+        Uma linha por (league, season, team, player). Cópias idênticas
+        (partições sobrepostas) são descartadas. Linhas diferentes com a
+        mesma chave, como homônimos no mesmo time, são unidas com aviso:
+        as contagens são somadas e as demais colunas vêm da linha com mais
+        minutos (90s).
+        """
+        df = df.drop_duplicates()
+        repetidas = df.duplicated(subset=CHAVES, keep=False)
+        if not repetidas.any():
+            return df
+        grupo = df[repetidas]
+        print(f"Aviso: {grupo[CHAVES].drop_duplicates().shape[0]} jogadores com mais de uma linha em "
+              f"{stat_type}; contagens somadas.")
+        if "90s" in grupo.columns:
+            grupo = grupo.sort_values("90s", ascending=False, kind="stable")
+        unidas = grupo.groupby(CHAVES, observed=True, sort=False).first()
+        contagens = [c for c in cls.colunas_contagem(grupo) if c not in CHAVES]
+        unidas[contagens] = grupo.groupby(CHAVES, observed=True, sort=False)[contagens].sum(min_count=1)
+        return pd.concat([df[~repetidas], unidas.reset_index()], ignore_index=True)
+
+    @staticmethod
+    def colunas_contagem(df):
+        return [
+            c for c in df.select_dtypes(include="number").columns
+            if c not in COLUNAS_DESCRITIVAS and not any(t in c for t in TRECHOS_NAO_CONTAGEM)
+        ]
+
+    @classmethod
+    def adicionar_por_90(cls, df):
+        """Divide todas as colunas de contagem por '90s' de uma vez (NaN para 0 minutos)."""
+        if "90s" not in df.columns:
+            return df
+        contagens = cls.colunas_contagem(df)
+        noventas = pd.to_numeric(df["90s"], errors="coerce").replace(0, np.nan)
+        por_90 = df[contagens].astype("float64").div(noventas, axis=0).astype("float32")
+        por_90.columns = [f"{c}_p90" for c in contagens]
+        return pd.concat([df, por_90], axis=1)
+
+    @staticmethod
+    def adicionar_percentis(df, minimo_90s=MINIMO_90S_PERCENTIL):
+        """Percentil de cada coluna por 90 dentro da temporada, entre jogadores com minutagem mínima."""
+        colunas = [c for c in df.columns if c.endswith("_p90")]
+        if not colunas or "90s" not in df.columns:
+            return df
+        elegiveis = pd.to_numeric(df["90s"], errors="coerce") >= minimo_90s
+        percentis = (
+            df.loc[elegiveis, colunas]
+            .groupby(df.loc[elegiveis, "season"], observed=True)
+            .rank(pct=True)
+            .astype("float32")
+            .reindex(df.index)
+        )
+        percentis.columns = [f"{c}_pct" for c in colunas]
+        return pd.concat([df, percentis], axis=1)
+
+    # Persistência
+
+    def salvar(self):
+        """Grava a tabela larga no dataset Parquet, uma partição por (liga, temporada)."""
+        for (liga, temporada), df in self.df.groupby(["league", "season"], observed=True, sort=False):
+            caminho, alterado = salvar_dataset(df, FONTE_TABELA_LARGA, liga, temporada_por_codigo(temporada), "todas")
+            print(f"{'Salvo' if alterado else 'Sem alterações'}: {caminho}")
+
+    @classmethod
+    def carregar(cls, liga=None, temporadas=None, colunas=None):
+        """Lê a tabela larga já persistida, sem refazer as junções."""
+        if colunas is not None:
+            colunas = CHAVES + [c for c in colunas if c not in CHAVES]
+        df = carregar_dataset(fonte=FONTE_TABELA_LARGA, liga=liga, temporada=temporadas,
+                              colunas=colunas, restaurar_estrutura=False)
+        return cls(tipar_fbref(df.drop(columns=["fonte", "liga", "temporada", "stat_type"], errors="ignore")))
+
+    # Consultas
+
+    def _buscar(self, coluna, valor):
+        posicoes = self._indices[coluna].get(valor)
+        if posicoes is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[posicoes]
+
+    def jogador(self, nome):
+        """Todas as temporadas de um jogador."""
+        return self._buscar("player", nome)
+
+    def time(self, nome):
+        return self._buscar("team", nome)
+
+    def temporada(self, codigo):
+        """Jogadores de uma temporada pelo código do FBref (ex.: '2223')."""
+        return self._buscar("season", codigo)
+
+
+if __name__ == "__main__":
+    loja = PlayerSeasonStore.construir()
+    print(f"Tabela larga: {loja.df.shape[0]} jogadores-temporada x {loja.df.shape[1]} colunas")
+    loja.salvar()
@@ -1,6 +1,7 @@
-from soccerdata import FBref
 import os
-import pandas as pd
+import sys
+from motor_coleta_fbref import Tarefa, executar_tarefas, salvar_relatorio, tarefas_com_falha
+from telemetria import telemetria
 
 #parametros
 anos = list(range(2010, 2027))
@@ -12,36 +13,39 @@ ligas = [
     "ITA-Serie A"
 ]
 
-output_dir = "dados_ligas"
-os.makedirs(output_dir, exist_ok=True)
-
-for liga_id in ligas:
-    for ano in anos:
-        temporada = f"{ano}-{str(ano+1)[-2:]}"
-        try:
-            print(f"Baixando dados gerais da liga{liga_id} - temporada {temporada}")
-            fbref = FBref(leagues=[liga_id], seasons=[temporada])
-
-            #lista de infos
-            df_leagues = fbref.read_leagues()
-            df_seasons = fbref.read_seasons()
-            df_team_season = fbref.read_team_season_stats(stat_type="standard")
-            df_team_match = fbref.read_team_match_stats(stat_type="schedule")
-            df_player_season = fbref.read_player_season_stats(stat_type="standard")
-            df_schedule = fbref.read_schedule()
-
-            #salva arquivos csv por df 
-            base_name = f"{liga_id.replace(' ','_').replace('-','_')}_{temporada}"
-
-            df_leagues.to_csv(os.path.join(output_dir,f"{base_name}_leagues.csv"), index=False, encoding='utf-8-sig')
-            df_seasons.to_csv(os.path.join(output_dir, f"{base_name}_seasons.csv"),index=False, encoding='utf-8-sig')
-            df_team_season.to_csv(os.path.join(output_dir, f"{base_name}_team_season.csv"),index=False, encoding='utf-8-sig')
-            df_team_match.to_csv(os.path.join(output_dir, f"{base_name}_team_match.csv"),index=False, encoding='utf-8-sig')
-            df_player_season.to_csv(os.path.join(output_dir, f"{base_name}_player_season.csv"),index=False, encoding='utf-8-sig')
-            df_schedule.to_csv(os.path.join(output_dir, f"{base_name}_schedule.csv"),index=False, encoding='utf-8-sig')
-
-            print(f"Dados salvos para {liga_id} - {temporada}")
-
-        except Exception as e:
-            print(f"Erro ao baixar dados da {liga_id} -{temporada}: {e: }")
-            
\ No newline at end of file
+#tabela salva -> (leitor do FBref, argumentos)
+leituras = {
+    "leagues": ("read_leagues", {}),
+    "seasons": ("read_seasons", {}),
+    "team_season": ("read_team_season_stats", {"stat_type": "standard"}),
+    "team_match": ("read_team_match_stats", {"stat_type": "schedule"}),
+    "player_season": ("read_player_season_stats", {"stat_type": "standard"}),
+    "schedule": ("read_schedule", {}),
+}
+
+CAMINHO_RELATORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "relatorio_coleta_ligas.json")
+
+
+def montar_tarefas(ligas=ligas, anos=anos):
+    """Uma tarefa por (liga, temporada, leitura), cada uma gravando uma partição Parquet."""
+    return [
+        Tarefa(liga_id, f"{ano}-{str(ano+1)[-2:]}", leitor, kwargs, "fbref_ligas", nome_tabela)
+        for liga_id in ligas
+        for ano in anos
+        for nome_tabela, (leitor, kwargs) in leituras.items()
+    ]
+
+
+def coletar(ligas=ligas, anos=anos, apenas_falhas=False):
+    """Executa as tarefas (ou só as que falharam na última execução) e grava o relatório."""
+    tarefas = tarefas_com_falha(CAMINHO_RELATORIO) if apenas_falhas else montar_tarefas(ligas, anos)
+    print(f"Baixando dados gerais de {len(ligas)} ligas: {len(tarefas)} tarefas")
+    relatorio = executar_tarefas(tarefas)
+    salvar_relatorio(relatorio, CAMINHO_RELATORIO)
+    return relatorio
+
+
+if __name__ == "__main__":
+    #com --falhas, reexecuta só as tarefas que falharam na última execução
+    coletar(apenas_falhas="--falhas" in sys.argv)
+    telemetria.salvar_relatorio("ligas")
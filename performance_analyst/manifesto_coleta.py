@@ -0,0 +1,86 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone, timedelta
+
+# Dias após o fim da temporada em que ainda aceitamos correções da API
+DIAS_CARENCIA_ENCERRAMENTO = 7
+
+
+def agora_utc():
+    return datetime.now(timezone.utc)
+
+
+def hash_arquivo(caminho):
+    """Retorna o md5 do arquivo em disco, ou None se ele não existir."""
+    if not os.path.exists(caminho):
+        return None
+    md5 = hashlib.md5()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(bloco)
+    return md5.hexdigest()
+
+
+def carregar_manifesto(caminho):
+    """Lê o manifesto de coleta; devolve um dicionário vazio se ele ainda não existir."""
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_manifesto(manifesto, caminho):
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(temporario, caminho)
+
+
+def obter_entrada(manifesto, endpoint, competition_code, ano_temporada):
+    return manifesto.get(endpoint, {}).get(competition_code, {}).get(str(ano_temporada))
+
+
+def registrar_coleta(manifesto, endpoint, competition_code, ano_temporada, caminho_arquivo,
+                     season_end_date=None, last_updated=None):
+    """
+    Registra uma coleta bem-sucedida: horário, fim da temporada, último
+    lastUpdated informado pela API e hash do arquivo salvo. Campos não
+    informados mantêm o valor da coleta anterior.
+    """
+    anterior = obter_entrada(manifesto, endpoint, competition_code, ano_temporada) or {}
+    entrada = {
+        "fetched_at": agora_utc().isoformat(timespec="seconds"),
+        "season_end_date": season_end_date or anterior.get("season_end_date"),
+        "last_updated": last_updated or anterior.get("last_updated"),
+        "hash": hash_arquivo(caminho_arquivo),
+        "arquivo": caminho_arquivo,
+    }
+    manifesto.setdefault(endpoint, {}).setdefault(competition_code, {})[str(ano_temporada)] = entrada
+    return entrada
+
+
+def arquivo_intacto(entrada):
+    """True se o arquivo registrado ainda existe com o mesmo conteúdo."""
+    return bool(entrada) and entrada.get("hash") is not None and hash_arquivo(entrada.get("arquivo", "")) == entrada["hash"]
+
+
+def temporada_encerrada(entrada):
+    """
+    Uma temporada está encerrada quando a última coleta aconteceu depois do
+    fim da temporada (mais a carência) e o arquivo salvo não foi alterado.
+    Nesse caso os dados não mudam mais e a requisição pode ser pulada.
+    """
+    if not arquivo_intacto(entrada) or not entrada.get("season_end_date"):
+        return False
+    fim = datetime.fromisoformat(entrada["season_end_date"]).date()
+    coletado_em = datetime.fromisoformat(entrada["fetched_at"]).date()
+    return coletado_em > fim + timedelta(days=DIAS_CARENCIA_ENCERRAMENTO)
+
+
+def inicio_janela_incremental(entrada, margem_dias=DIAS_CARENCIA_ENCERRAMENTO):
+    """Data (YYYY-MM-DD) a partir da qual buscar partidas desde a última coleta."""
+    coletado_em = datetime.fromisoformat(entrada["fetched_at"]).date()
+    return (coletado_em - timedelta(days=margem_dias)).isoformat()
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import multiprocessing
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from armazenamento_raw_data import FBrefRegistrado, LojaRawData, ler_com_cache
+from armazenamento_parquet import salvar_dataset
+from esquemas_fbref import tipar_fbref
+from estatisticas_jogadores import dividir_por_liga
+from telemetria import contar, etapa, telemetria
+
+# Intervalo mínimo entre duas requisições ao FBref, somando todos os processos
+INTERVALO_FBREF = 6.0
+
+# Uma leitura de uma liga/temporada, gravada na partição (fonte, liga, temporada, stat_type)
+Tarefa = namedtuple("Tarefa", ["liga", "temporada", "leitor", "kwargs", "fonte", "stat_type"])
+
+
+def rotulo(tarefa):
+    argumentos = ", ".join(f"{k}={v}" for k, v in tarefa.kwargs.items())
+    return f"{tarefa.liga} {tarefa.temporada} {tarefa.leitor}({argumentos})"
+
+
+class LimitadorGlobal:
+    """
+    Espaça as requisições de todos os processos em INTERVALO_FBREF segundos.
+    Cada chamada reserva o próximo horário livre sob a trava e dorme fora
+    dela, então os processos não ficam bloqueados uns pelos outros.
+    """
+
+    def __init__(self, intervalo=INTERVALO_FBREF, contexto=multiprocessing):
+        self.intervalo = intervalo
+        self._proximo = contexto.Value("d", 0.0, lock=False)
+        self._trava = contexto.Lock()
+
+    def aguardar(self):
+        with self._trava:
+            agora = time.time()
+            horario = max(agora, self._proximo.value)
+            self._proximo.value = horario + self.intervalo
+        if horario > agora:
+            with etapa("fbref_espera_cota"):
+                time.sleep(horario - agora)
+
+
+class FBrefLimitado(FBrefRegistrado):
+    """
+    FBref que respeita o limitador global em cada GET (inclusive nas novas
+    tentativas) em vez da pausa fixa por instância, e grava as páginas de
+    forma atômica para que outro processo nunca leia um arquivo pela metade.
+    """
+
+    def __init__(self, *args, limitador=None, **kwargs):
+        self.limitador = limitador
+        super().__init__(*args, **kwargs)
+        if limitador is not None:
+            self.rate_limit = 0
+
+    def _init_session(self):
+        sessao = super()._init_session()
+        if self.limitador is not None:
+            get_original = sessao.get
+
+            def get_limitado(*args, **kwargs):
+                self.limitador.aguardar()
+                with etapa("fbref_download"):
+                    resposta = get_original(*args, **kwargs)
+                contar("fbref_requisicoes")
+                contar("fbref_bytes", len(resposta.content))
+                contar(f"fbref_http_{resposta.status_code}")
+                return resposta
+
+            sessao.get = get_limitado
+        return sessao
+
+    def _download_and_save(self, url, filepath=None, var=None):
+        conteudo = super()._download_and_save(url, None, var)
+        if filepath is not None and not self.no_store:
+            filepath = Path(filepath)
+            temporario = filepath.with_suffix(f".{os.getpid()}.tmp")
+            temporario.write_bytes(conteudo.getvalue())
+            os.replace(temporario, filepath)
+        return conteudo
+
+
+# Estado de cada processo do pool, criado uma vez pelo inicializador
+_limitador = None
+_loja = None
+
+
+def _iniciar_processo(limitador, trava_loja):
+    global _limitador, _loja
+    _limitador = limitador
+    _loja = LojaRawData(trava=trava_loja)
+
+
+def executar_tarefa(tarefa):
+    """
+    Baixa (respeitando o limitador), extrai a tabela e grava as partições
+    no próprio processo (uma por liga real, na leitura combinada das 5
+    grandes ligas). Devolve também a telemetria da tarefa, para ser somada
+    à do processo principal.
+    """
+    telemetria.zerar()
+    fbref = FBrefLimitado(leagues=[tarefa.liga], seasons=[tarefa.temporada], limitador=_limitador)
+    df = ler_com_cache(fbref, tarefa.leitor, loja=_loja, **tarefa.kwargs)
+    df = tipar_fbref(df, tarefa.kwargs.get("stat_type"))
+    salvos = [
+        salvar_dataset(df_liga, tarefa.fonte, liga, tarefa.temporada, tarefa.stat_type)
+        for liga, df_liga in dividir_por_liga(df, tarefa.liga)
+    ]
+    caminhos = ", ".join(str(caminho) for caminho, _ in salvos)
+    return caminhos, any(alterado for _, alterado in salvos), len(df), telemetria.exportar()
+
+
+def baixar_paginas_compartilhadas(tarefas, limitador, loja):
+    """
+    Baixa no processo principal as páginas que todas as tarefas leem antes
+    da sua própria tabela (lista de competições e temporadas de cada liga).
+    Sem isso, cada processo do pool pediria as mesmas páginas ao abrir.
+    """
+    temporadas_por_liga = {}
+    for tarefa in tarefas:
+        temporadas_por_liga.setdefault(tarefa.liga, set()).add(tarefa.temporada)
+    # Uma leitura por liga: o soccerdata reduz uma lista com a liga combinada só a ela
+    for liga, temporadas in sorted(temporadas_por_liga.items()):
+        fbref = FBrefLimitado(leagues=[liga], seasons=sorted(temporadas), limitador=limitador)
+        loja.materializar(fbref.data_dir)
+        try:
+            with etapa("fbref_paginas_compartilhadas"):
+                fbref.read_seasons()
+        except Exception as e:
+            # Cada tarefa tenta de novo e registra a própria falha
+            print(f"Aviso: páginas compartilhadas de {liga} não foram baixadas ({type(e).__name__}: {e}).")
+
+
+def executar_tarefas(tarefas, max_processos=None, intervalo=INTERVALO_FBREF):
+    """
+    Distribui as tarefas em um pool de processos. O download é limitado
+    globalmente; a análise do HTML e o processamento dos DataFrames rodam
+    em paralelo. Uma tarefa com erro não interrompe as demais.
+    Retorna um relatório com as tarefas concluídas e as falhas.
+    """
+    contexto = multiprocessing.get_context("spawn")
+    limitador = LimitadorGlobal(intervalo, contexto)
+    trava_loja = contexto.Lock()
+    max_processos = max_processos or os.cpu_count() or 1
+    baixar_paginas_compartilhadas(tarefas, limitador, LojaRawData(trava=trava_loja))
+
+    relatorio = {"concluidas": [], "falhas": []}
+    inicio = time.time()
+    with ProcessPoolExecutor(max_processos, mp_context=contexto, initializer=_iniciar_processo,
+                             initargs=(limitador, trava_loja)) as pool:
+        futuros = {pool.submit(executar_tarefa, tarefa): tarefa for tarefa in tarefas}
+        for i, futuro in enumerate(as_completed(futuros), start=1):
+            tarefa = futuros[futuro]
+            try:
+                caminho, alterado, linhas, dados_telemetria = futuro.result()
+            except Exception as e:
+                contar("tarefas_com_falha")
+                relatorio["falhas"].append({
+                    "tarefa": tarefa._asdict(),
+                    "erro": f"{type(e).__name__}: {e}",
+                    "traceback": "".join(traceback.format_exception(type(e), e, e.__traceback__)),
+                })
+                print(f"[{i}/{len(tarefas)}] Falha: {rotulo(tarefa)} -> {type(e).__name__}: {e}")
+                continue
+            telemetria.mesclar(dados_telemetria)
+            contar("tarefas_concluidas")
+            relatorio["concluidas"].append({"tarefa": tarefa._asdict(), "arquivo": caminho, "alterado": alterado})
+            print(f"[{i}/{len(tarefas)}] {'Salvo' if alterado else 'Sem alterações'}: {rotulo(tarefa)} ({linhas} linhas)")
+
+    relatorio["duracao_segundos"] = round(time.time() - inicio, 1)
+    return relatorio
+
+
+def salvar_relatorio(relatorio, caminho):
+    """Grava o relatório em JSON e imprime o resumo das falhas."""
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\n{len(relatorio['concluidas'])} tarefas concluídas e {len(relatorio['falhas'])} com falha "
+          f"em {relatorio['duracao_segundos']} s. Relatório: {caminho}")
+    for falha in relatorio["falhas"]:
+        print(f"  - {rotulo(Tarefa(**falha['tarefa']))}: {falha['erro']}")
+
+
+def tarefas_com_falha(caminho):
+    """Tarefas que falharam em uma execução anterior, para reexecutar só elas."""
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, "r", encoding="utf-8") as f:
+        relatorio = json.load(f)
+    return [Tarefa(**falha["tarefa"]) for falha in relatorio.get("falhas", [])]
@@ -0,0 +1,140 @@
+import os
+import pandas as pd
+from telemetria import contar, cronometrado, etapa
+
+# Campos que são listas de objetos e viram tabelas filhas em vez de colunas da partida
+COLUNAS_DE_LISTA = ['goals', 'bookings', 'substitutions', 'referees']
+COLUNAS_DE_LISTA_TIME = ['lineup', 'bench']
+
+# Tabela filha -> campo da partida (record_path do json_normalize)
+TABELAS_FILHAS = {
+    'gols': 'goals',
+    'cartoes': 'bookings',
+    'substituicoes': 'substitutions',
+    'arbitros': 'referees',
+}
+
+NOMES_TABELAS_FILHAS = list(TABELAS_FILHAS) + ['escalacoes']
+
+
+def _sem_listas(partida):
+    """Cópia rasa da partida sem os campos de lista (inclusive lineup/bench dos times)."""
+    linha = {k: v for k, v in partida.items() if k not in COLUNAS_DE_LISTA}
+    for lado in ('homeTeam', 'awayTeam'):
+        time = partida.get(lado)
+        if isinstance(time, dict):
+            linha[lado] = {k: v for k, v in time.items() if k not in COLUNAS_DE_LISTA_TIME}
+    return linha
+
+
+@cronometrado("normalizacao_partidas")
+def normalizar_partidas(partidas):
+    """
+    Achata todas as partidas em um único json_normalize, em vez de um
+    DataFrame por partida. Os campos de lista ficam de fora da tabela
+    principal e são expostos por `gerar_tabelas_filhas`.
+    """
+    contar("partidas_normalizadas", len(partidas))
+    return pd.json_normalize([_sem_listas(p) for p in partidas], sep='_')
+
+
+def _normalizar_registros(partidas, record_path, **colunas_fixas):
+    """json_normalize de uma lista aninhada de cada partida, com a chave match_id."""
+    campo = record_path[0] if isinstance(record_path, list) else record_path
+    if isinstance(record_path, list):
+        com_dados = [p for p in partidas if (p.get(campo) or {}).get(record_path[1])]
+    else:
+        com_dados = [p for p in partidas if p.get(campo)]
+    if not com_dados:
+        return None
+
+    meta = ['id']
+    if isinstance(record_path, list):
+        meta.append([campo, 'id'])
+    df = pd.json_normalize(com_dados, record_path=record_path, meta=meta, meta_prefix='match_', sep='_')
+    df = df.rename(columns={f'match_{campo}_id': 'team_id'})
+    for coluna, valor in colunas_fixas.items():
+        df[coluna] = valor
+    return df
+
+
+def gerar_tabelas_filhas(partidas):
+    """
+    Gera (nome, DataFrame) para gols, cartões, substituições, árbitros e
+    escalações (titulares e reservas), todas em formato longo com match_id.
+    As tabelas são produzidas uma de cada vez para serem gravadas e
+    liberadas em seguida.
+    """
+    for nome, campo in TABELAS_FILHAS.items():
+        df = _normalizar_registros(partidas, campo)
+        if df is not None:
+            yield nome, df
+
+    escalacoes = [
+        _normalizar_registros(partidas, [lado, tipo], lado=lado, tipo=tipo)
+        for lado in ('homeTeam', 'awayTeam')
+        for tipo in COLUNAS_DE_LISTA_TIME
+    ]
+    escalacoes = [df for df in escalacoes if df is not None]
+    if escalacoes:
+        yield 'escalacoes', pd.concat(escalacoes, ignore_index=True)
+
+
+def etapa_tabelas_filhas(partidas):
+    """gerar_tabelas_filhas com o tempo de cada normalização na etapa 'normalizacao_tabelas_filhas'."""
+    geradas = gerar_tabelas_filhas(partidas)
+    while True:
+        with etapa("normalizacao_tabelas_filhas"):
+            item = next(geradas, None)
+        if item is None:
+            return
+        yield item
+
+
+def _mesclar_existente(caminho_arquivo, df, ids_recebidos):
+    """Linhas do CSV existente de outras partidas + as novas (df pode ser None)."""
+    df_existente = pd.read_csv(caminho_arquivo, encoding='utf-8-sig')
+    df_existente = df_existente[~df_existente['match_id'].isin(ids_recebidos)]
+    return df_existente if df is None else pd.concat([df_existente, df], ignore_index=True)
+
+
+def salvar_tabelas_filhas(partidas, pasta, sufixo, incremental=False):
+    """
+    Grava cada tabela filha em `pasta` como <nome>_<sufixo>.csv.
+    No modo incremental, as linhas das partidas recebidas substituem as
+    antigas em todas as tabelas, inclusive nas que não vieram nesta
+    resposta (uma partida corrigida para 0 a 0 perde os gols antigos), e
+    o restante do arquivo é preservado.
+    Retorna um dicionário nome da tabela -> arquivo gravado.
+    """
+    ids_recebidos = {p.get('id') for p in partidas}
+    geradas = etapa_tabelas_filhas(partidas)
+    if incremental:
+        # Tabelas sem linhas nesta resposta também perdem as linhas antigas das partidas recebidas
+        vazias = ((nome, None) for nome in NOMES_TABELAS_FILHAS)
+        geradas = _com_faltantes(geradas, vazias)
+
+    arquivos = {}
+    for nome, df in geradas:
+        caminho_arquivo = os.path.join(pasta, f"{nome}_{sufixo}.csv")
+        if incremental and os.path.exists(caminho_arquivo):
+            df = _mesclar_existente(caminho_arquivo, df, ids_recebidos)
+        if df is None:
+            continue
+        with etapa("escrita_csv"):
+            df.to_csv(caminho_arquivo, index=False, encoding='utf-8-sig')
+        contar("csv_linhas", len(df))
+        arquivos[nome] = caminho_arquivo
+        print(f"    Tabela '{nome}' com {len(df)} linhas salva em: {caminho_arquivo}")
+    return arquivos
+
+
+def _com_faltantes(geradas, todas):
+    """As tabelas geradas (uma por vez) e depois as de `todas` que não foram geradas."""
+    vistas = set()
+    for nome, df in geradas:
+        vistas.add(nome)
+        yield nome, df
+    for nome, df in todas:
+        if nome not in vistas:
+            yield nome, df
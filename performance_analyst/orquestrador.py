@@ -0,0 +1,400 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import traceback
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+from armazenamento_parquet import PASTA_DATASET, caminho_particao
+from manifesto_coleta import carregar_manifesto, hash_arquivo, salvar_manifesto
+from telemetria import contar, etapa, telemetria
+
+RAIZ_REPO = Path(__file__).resolve().parent.parent
+CAMINHO_CHECKPOINT = RAIZ_REPO / "checkpoint_pipeline.json"
+
+# Execuções simultâneas por fonte. Cada fonte tem sua própria cota, então
+# fontes diferentes rodam em paralelo. FBref fica (e tem de ficar) em 1
+# porque cada coleta já usa um pool de processos com o seu limitador
+# global, que não é compartilhado entre coletas; football-data em
+# 1 porque os dois coletores compartilham o manifesto_coleta.json.
+CONCORRENCIA_POR_FONTE = {"fbref": 1, "sofifa": 1, "football_data": 1, "local": 2}
+
+STATUS_OK = ("concluida", "pulada")
+
+
+class TarefaPipeline:
+    """
+    Uma etapa do pipeline: a função que a executa, a fonte (que define o
+    limite de concorrência), as tarefas de que depende e os arquivos ou
+    pastas que lê e grava. A tarefa é pulada quando todas as saídas
+    existem e a última execução bem-sucedida não passou da validade e leu
+    as mesmas entradas (pelo conteúdo) que existem agora.
+    """
+
+    def __init__(self, nome, fonte, executar, saidas, entradas=(), depende_de=(),
+                 validade=timedelta(days=1), descricao=""):
+        self.nome = nome
+        self.fonte = fonte
+        self.executar = executar
+        self.saidas = [Path(s) for s in saidas]
+        self.entradas = [Path(e) for e in entradas]
+        self.depende_de = list(depende_de)
+        self.validade = validade
+        self.descricao = descricao
+
+
+TAREFAS = {}
+
+
+def registrar(tarefa):
+    TAREFAS[tarefa.nome] = tarefa
+    return tarefa
+
+
+# Funções das tarefas (imports tardios: cada coletor carrega suas dependências)
+
+def _carregar_script(nome_arquivo):
+    """Importa um script da raiz do repositório (COLETAR_*.PY não tem extensão .py minúscula)."""
+    loader = SourceFileLoader(Path(nome_arquivo).stem.lower(), str(RAIZ_REPO / nome_arquivo))
+    modulo = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+    loader.exec_module(modulo)
+    return modulo
+
+
+def _verificar_falhas(falhas, descricao):
+    if falhas:
+        raise RuntimeError(f"{len(falhas)} {descricao} falharam: {falhas[:5]}")
+
+
+def _coletar_fbref_ligas():
+    import ligas
+    _verificar_falhas(ligas.coletar()["falhas"], "tarefas de ligas.py (ver relatorio_coleta_ligas.json)")
+
+
+def _coletar_fbref_times():
+    import estatisticas_time
+    _verificar_falhas(estatisticas_time.coletar()["falhas"], "tarefas de estatisticas_time.py (ver relatorio_coleta_times.json)")
+
+
+def _coletar_fbref_jogadores():
+    import estatisticas_jogadores
+    _verificar_falhas(estatisticas_jogadores.coletar(), "stat_types de jogadores")
+
+
+def _coletar_fbref_padrao_traduzido():
+    import estatisticas_por_jogo
+    _verificar_falhas(estatisticas_por_jogo.coletar(), "temporadas de estatisticas_por_jogo.py")
+
+
+def _coletar_fbref_partidas_jogadores():
+    import estatisticas_jogadores_partida
+    _verificar_falhas(estatisticas_jogadores_partida.coletar(), "partidas")
+
+
+def _construir_jogadores_temporada():
+    from jogadores_temporada import PlayerSeasonStore
+    PlayerSeasonStore.construir().salvar()
+
+
+def _coletar_sofifa():
+    import estatisticas_jogadores_sofifa
+    estatisticas_jogadores_sofifa.coletar(100)
+
+
+def _coletar_fd(nome_arquivo, funcao, competicoes):
+    modulo = _carregar_script(nome_arquivo)
+    if not modulo.token_disponivel():
+        raise RuntimeError("Token FD_AUTH_TOKEN não encontrado e modo offline desativado.")
+    getattr(modulo, funcao)(getattr(modulo, competicoes), ano_inicio=modulo.ANO_INICIAL_COLETA)
+
+
+def _resolver_entidades():
+    from resolucao_entidades import Crosswalk
+    Crosswalk().atualizar()
+
+
+def _atualizar_ratings():
+    from ratings_times import atualizar, competicoes_disponiveis
+    for competicao in competicoes_disponiveis():
+        atualizar(competicao)
+
+
+def _materializar_arrow():
+    from datasets_compartilhados import materializar
+    materializar()
+
+
+def _exportar_powerbi():
+    from exportacao_powerbi import ModeloEstrela
+    ModeloEstrela().exportar()
+
+
+def _particao(fonte):
+    return caminho_particao(PASTA_DATASET, fonte=fonte)
+
+
+PASTA_FOOTBALL_DATA = RAIZ_REPO / "dados_coletados_football_data_org"
+PASTA_POWERBI = Path(os.getenv("PASTA_POWERBI", RAIZ_REPO / "powerbi"))
+PASTA_ARROW = Path(os.getenv("PASTA_ARROW", RAIZ_REPO / "dados_arrow"))
+
+registrar(TarefaPipeline("fbref_ligas", "fbref", _coletar_fbref_ligas, [_particao("fbref_ligas")],
+                         descricao="ligas.py: ligas, temporadas, calendário e tabelas padrão"))
+registrar(TarefaPipeline("fbref_times", "fbref", _coletar_fbref_times, [_particao("fbref_times")],
+                         descricao="estatisticas_time.py: estatísticas de times por stat_type"))
+registrar(TarefaPipeline("fbref_jogadores", "fbref", _coletar_fbref_jogadores, [_particao("fbref_jogadores")],
+                         descricao="estatisticas_jogadores.py: estatísticas de jogadores por temporada"))
+registrar(TarefaPipeline("fbref_padrao_traduzido", "fbref", _coletar_fbref_padrao_traduzido,
+                         [_particao("fbref_padrao_traduzido")],
+                         descricao="estatisticas_por_jogo.py: tabela padrão com colunas traduzidas"))
+registrar(TarefaPipeline("fbref_partidas_jogadores", "fbref", _coletar_fbref_partidas_jogadores,
+                         [_particao("fbref_partidas_jogadores")],
+                         descricao="estatisticas_jogadores_partida.py: jogadores por partida"))
+registrar(TarefaPipeline("jogadores_temporada", "local", _construir_jogadores_temporada,
+                         [_particao("fbref_jogadores_larga")], entradas=[_particao("fbref_jogadores")],
+                         depende_de=["fbref_jogadores"], validade=None,
+                         descricao="jogadores_temporada.py: tabela larga jogador-temporada"))
+registrar(TarefaPipeline("sofifa_jogadores", "sofifa", _coletar_sofifa, [_particao("sofifa_jogadores")],
+                         validade=timedelta(days=7),
+                         descricao="estatisticas_jogadores_sofifa.py: jogadores por versão e nacionalidade"))
+registrar(TarefaPipeline("fd_artilheiros", "football_data",
+                         lambda: _coletar_fd("COLETAR_ARTILHEIROS.PY", "coletar_artilheiros", "COMPETICOES_ALVO_ARTILHARIA"),
+                         [PASTA_FOOTBALL_DATA / "artilheiros"],
+                         descricao="COLETAR_ARTILHEIROS.PY: artilharia por competição"))
+registrar(TarefaPipeline("fd_partidas", "football_data",
+                         lambda: _coletar_fd("COLETAR_PARTIDAS_COMPETICAO.PY", "coletar_partidas", "COMPETICOES_ALVO_PARTIDAS"),
+                         [PASTA_FOOTBALL_DATA / "partidas_competicao"],
+                         descricao="COLETAR_PARTIDAS_COMPETICAO.PY: partidas e tabelas filhas"))
+registrar(TarefaPipeline("crosswalk", "local", _resolver_entidades,
+                         [_particao("crosswalk_times"), _particao("crosswalk_jogadores")],
+                         entradas=[_particao("fbref_jogadores_larga"), _particao("sofifa_jogadores"), PASTA_FOOTBALL_DATA],
+                         depende_de=["jogadores_temporada", "fd_partidas", "fd_artilheiros"], validade=None,
+                         descricao="resolucao_entidades.py: crosswalk football-data.org/SoFIFA -> FBref"))
+registrar(TarefaPipeline("ratings", "local", _atualizar_ratings,
+                         [_particao("ratings_partidas"), _particao("ratings_times")],
+                         entradas=[PASTA_FOOTBALL_DATA / "partidas_competicao"],
+                         depende_de=["fd_partidas"], validade=None,
+                         descricao="ratings_times.py: Elo, forma e casa/fora incrementais por competição"))
+registrar(TarefaPipeline("arrow", "local", _materializar_arrow, [PASTA_ARROW],
+                         entradas=[PASTA_FOOTBALL_DATA, _particao("fbref_times"), _particao("fbref_jogadores"),
+                                   _particao("fbref_jogadores_larga")],
+                         depende_de=["fd_partidas", "fd_artilheiros", "fbref_times", "fbref_jogadores", "jogadores_temporada"],
+                         validade=None,
+                         descricao="datasets_compartilhados.py: arquivos Arrow mapeáveis em memória para leitura compartilhada"))
+registrar(TarefaPipeline("powerbi", "local", _exportar_powerbi, [PASTA_POWERBI],
+                         entradas=[PASTA_FOOTBALL_DATA, _particao("fbref_times"), _particao("fbref_jogadores_larga")],
+                         depende_de=["fd_partidas", "fd_artilheiros", "fbref_times", "jogadores_temporada"], validade=None,
+                         descricao="exportacao_powerbi.py: modelo estrela particionado por temporada"))
+
+
+# Planejamento
+
+def selecionar(nomes=None):
+    """Tarefas pedidas mais todas as suas dependências, em ordem topológica."""
+    ordem, visitando = [], set()
+
+    def visitar(nome):
+        if nome in ordem:
+            return
+        if nome not in TAREFAS:
+            raise KeyError(f"Tarefa desconhecida: {nome}. Disponíveis: {', '.join(TAREFAS)}")
+        if nome in visitando:
+            raise ValueError(f"Dependência circular envolvendo '{nome}'.")
+        visitando.add(nome)
+        for dependencia in TAREFAS[nome].depende_de:
+            visitar(dependencia)
+        visitando.discard(nome)
+        ordem.append(nome)
+
+    for nome in nomes or TAREFAS:
+        visitar(nome)
+    return ordem
+
+
+def _arquivos(caminho):
+    if caminho.is_file():
+        return [caminho]
+    if caminho.is_dir():
+        return sorted(a for a in caminho.rglob("*") if a.is_file())
+    return []
+
+
+def assinatura_entradas(tarefa):
+    """
+    md5 do conteúdo de todos os arquivos de entrada, com o caminho de cada
+    um relativo à sua entrada (o mesmo em qualquer clone do repositório).
+    """
+    md5 = hashlib.md5()
+    for i, entrada in enumerate(tarefa.entradas):
+        for arquivo in _arquivos(entrada):
+            relativo = arquivo.relative_to(entrada) if arquivo != entrada else Path(arquivo.name)
+            md5.update(f"{i}:{relativo.as_posix()}:{hash_arquivo(arquivo)}".encode("utf-8"))
+    return md5.hexdigest()
+
+
+def _ultima_modificacao(caminho):
+    """mtime mais recente do arquivo, ou de qualquer arquivo dentro da pasta; None se não existir."""
+    if caminho.is_file():
+        return caminho.stat().st_mtime
+    if caminho.is_dir():
+        return max((a.stat().st_mtime for a in caminho.rglob("*") if a.is_file()), default=None)
+    return None
+
+
+def saidas_atuais(tarefa, execucao=None, agora=None):
+    """
+    True se todas as saídas existem e a última execução bem-sucedida
+    (`execucao`, registrada no checkpoint) ainda vale: está dentro da
+    validade e as entradas têm o mesmo conteúdo de então. As saídas cujo
+    conteúdo não muda não são regravadas, então a data delas não serve
+    para isso. Sem registro, compara as datas das saídas e das entradas.
+    """
+    agora = agora or time.time()
+    modificacoes_saidas = [_ultima_modificacao(s) for s in tarefa.saidas]
+    if not modificacoes_saidas or None in modificacoes_saidas:
+        return False
+    if execucao is not None:
+        concluida_em = datetime.fromisoformat(execucao["concluida_em"]).timestamp()
+        if tarefa.validade is not None and agora - concluida_em > tarefa.validade.total_seconds():
+            return False
+        return not tarefa.entradas or execucao.get("entradas") == assinatura_entradas(tarefa)
+    mais_antiga = min(modificacoes_saidas)
+    if tarefa.validade is not None and agora - mais_antiga > tarefa.validade.total_seconds():
+        return False
+    modificacoes_entradas = [m for m in (_ultima_modificacao(e) for e in tarefa.entradas) if m is not None]
+    return not modificacoes_entradas or mais_antiga >= max(modificacoes_entradas)
+
+
+def _executar_cronometrado(tarefa):
+    with etapa(f"tarefa_{tarefa.nome}"):
+        tarefa.executar()
+
+
+def executar_pipeline(nomes=None, retomar=False, forcar=False, concorrencia=None, caminho_checkpoint=CAMINHO_CHECKPOINT):
+    """
+    Executa as tarefas respeitando as dependências e o limite de
+    concorrência de cada fonte. Fontes independentes rodam ao mesmo tempo.
+    O estado de cada tarefa vai para o checkpoint assim que ela termina;
+    com retomar=True, as tarefas concluídas na execução anterior são
+    puladas e só as que falharam ou não chegaram a rodar são executadas.
+    A última execução bem-sucedida de cada tarefa (horário e assinatura
+    das entradas) é mantida no checkpoint entre execuções.
+    Devolve o dicionário nome -> status.
+    """
+    concorrencia = {**CONCORRENCIA_POR_FONTE, **(concorrencia or {})}
+    if concorrencia["fbref"] > 1:
+        raise ValueError("A concorrência do fbref deve ser 1: cada coleta tem o seu limitador, e duas ao mesmo tempo dobrariam o ritmo de requisições.")
+    ordem = selecionar(nomes)
+    checkpoint_anterior = carregar_manifesto(caminho_checkpoint)
+    anterior = checkpoint_anterior.get("tarefas", {}) if retomar else {}
+    execucoes = checkpoint_anterior.get("execucoes", {})
+    checkpoint = {"iniciado_em": datetime.now().isoformat(timespec="seconds"), "retomada": retomar, "tarefas": {},
+                  "execucoes": execucoes}
+
+    def registrar_status(nome, status, **extra):
+        estados[nome] = status
+        checkpoint["tarefas"][nome] = {"status": status, "em": datetime.now().isoformat(timespec="seconds"), **extra}
+        salvar_manifesto(checkpoint, caminho_checkpoint)
+        contar(f"tarefas_{status}")
+
+    estados = {}
+    pendentes = list(ordem)
+    em_execucao = {}
+    vagas = {fonte: max(1, n) for fonte, n in concorrencia.items()}
+
+    with ThreadPoolExecutor(max_workers=sum(vagas.values())) as pool:
+        while pendentes or em_execucao:
+            for nome in list(pendentes):
+                tarefa = TAREFAS[nome]
+                dependencias = [estados.get(d) for d in tarefa.depende_de if d in ordem]
+                if any(s in ("falhou", "bloqueada") for s in dependencias):
+                    pendentes.remove(nome)
+                    registrar_status(nome, "bloqueada", motivo="dependência falhou")
+                    print(f"[{nome}] bloqueada: uma dependência falhou.")
+                    continue
+                if not all(s in STATUS_OK for s in dependencias):
+                    continue
+                if anterior.get(nome, {}).get("status") in STATUS_OK:
+                    pendentes.remove(nome)
+                    registrar_status(nome, "pulada", motivo="concluída na execução anterior")
+                    print(f"[{nome}] pulada: concluída na execução retomada.")
+                    continue
+                if not forcar and saidas_atuais(tarefa, execucoes.get(nome)):
+                    pendentes.remove(nome)
+                    registrar_status(nome, "pulada", motivo="saídas atualizadas")
+                    print(f"[{nome}] pulada: saídas atualizadas.")
+                    continue
+                if vagas.setdefault(tarefa.fonte, 1) == 0:
+                    continue
+                vagas[tarefa.fonte] -= 1
+                pendentes.remove(nome)
+                # Assinatura antes de executar: é o que esta execução lê
+                assinatura = assinatura_entradas(tarefa)
+                em_execucao[pool.submit(_executar_cronometrado, tarefa)] = (nome, time.time(), assinatura)
+                estados[nome] = "executando"
+                print(f"[{nome}] iniciada ({tarefa.fonte}).")
+
+            if not em_execucao:
+                break
+
+            concluidos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                nome, inicio, assinatura = em_execucao.pop(futuro)
+                vagas[TAREFAS[nome].fonte] += 1
+                duracao = round(time.time() - inicio, 1)
+                try:
+                    futuro.result()
+                except Exception as e:
+                    registrar_status(nome, "falhou", duracao_segundos=duracao, erro=f"{type(e).__name__}: {e}",
+                                     traceback="".join(traceback.format_exception(type(e), e, e.__traceback__)))
+                    print(f"[{nome}] falhou após {duracao} s: {type(e).__name__}: {e}")
+                else:
+                    execucoes[nome] = {"concluida_em": datetime.now().isoformat(timespec="seconds"), "entradas": assinatura}
+                    registrar_status(nome, "concluida", duracao_segundos=duracao)
+                    print(f"[{nome}] concluída em {duracao} s.")
+
+    return estados
+
+
+def listar(caminho_checkpoint=CAMINHO_CHECKPOINT):
+    execucoes = carregar_manifesto(caminho_checkpoint).get("execucoes", {})
+    for nome in selecionar():
+        tarefa = TAREFAS[nome]
+        situacao = "atualizada" if saidas_atuais(tarefa, execucoes.get(nome)) else "pendente"
+        dependencias = f" (depende de: {', '.join(tarefa.depende_de)})" if tarefa.depende_de else ""
+        print(f"  {nome:<26} [{tarefa.fonte:<13}] {situacao:<10} {tarefa.descricao}{dependencias}")
+
+
+def _ler_concorrencia(texto):
+    """'fbref=1,sofifa=2' -> {'fbref': 1, 'sofifa': 2}"""
+    return {fonte: int(n) for fonte, n in (item.split("=") for item in texto.split(",") if item)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa as coletas como um pipeline com dependências.")
+    parser.add_argument("tarefas", nargs="*", help="tarefas a executar (padrão: todas); dependências são incluídas")
+    parser.add_argument("--listar", action="store_true", help="mostra as tarefas, fontes e se estão atualizadas")
+    parser.add_argument("--retomar", action="store_true", help="pula o que foi concluído na última execução")
+    parser.add_argument("--forcar", action="store_true", help="executa mesmo com as saídas atualizadas")
+    parser.add_argument("--concorrencia", type=_ler_concorrencia, default=None, help="ex.: sofifa=1,local=4")
+    args = parser.parse_args()
+
+    # Os scripts COLETAR_*.PY gravam em dados_coletados_football_data_org/
+    # relativo à pasta atual; os módulos de performance_analyst/ resolvem
+    # os seus caminhos pelo próprio arquivo
+    os.chdir(RAIZ_REPO)
+
+    if args.listar:
+        listar()
+        sys.exit(0)
+
+    estados = executar_pipeline(args.tarefas, retomar=args.retomar, forcar=args.forcar, concorrencia=args.concorrencia)
+    print("\nResumo do pipeline:")
+    for nome, status in estados.items():
+        print(f"  {nome:<26} {status}")
+    telemetria.salvar_relatorio("pipeline")
+    sys.exit(1 if any(s in ("falhou", "bloqueada") for s in estados.values()) else 0)
@@ -0,0 +1,305 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from armazenamento_parquet import PASTA_DATASET, caminho_particao, carregar_dataset, salvar_dataset
+from esquemas_football_data import RegistroEsquemas, ler_csv_tipado
+from manifesto_coleta import carregar_manifesto, salvar_manifesto
+from telemetria import contar, etapa, telemetria
+
+PASTA_FOOTBALL_DATA = Path(__file__).resolve().parent.parent / "dados_coletados_football_data_org"
+PASTA_ESTADOS = os.path.join(PASTA_DATASET, "estado_ratings")
+
+# Partições: fonte=ratings_partidas/liga=<competição>/temporada=<ano>/stat_type=partidas
+#            fonte=ratings_times/liga=<competição>/stat_type=atual
+FONTE_PARTIDAS = "ratings_partidas"
+FONTE_TIMES = "ratings_times"
+
+ELO_INICIAL = 1500.0
+K_ELO = 20.0
+VANTAGEM_MANDANTE = 60.0
+# Fração da distância até a média descontada de cada time no início de uma temporada
+REGRESSAO_TEMPORADA = 0.25
+JANELA_FORMA = 5
+
+# Colunas dos acumulados em casa e fora
+SPLITS = ["jogos", "vitorias", "empates", "gols_pro", "gols_contra"]
+
+
+def _media_janela(janela):
+    """Média de cada linha da janela de forma, ignorando as posições ainda vazias (NaN)."""
+    jogos = (~np.isnan(janela)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nansum(janela, axis=1) / np.where(jogos, jogos, np.nan)
+
+
+def _lista(array):
+    """Array -> lista JSON, com None no lugar de NaN."""
+    return np.where(np.isnan(array), None, array).tolist()
+
+
+class EstadoCompeticao:
+    """
+    Estado dos ratings de uma competição depois da última partida
+    processada: Elo, últimos JANELA_FORMA gols pró/contra e acumulados em
+    casa e fora de cada time, guardados em arrays (uma linha por time).
+    Persistido em JSON, permite processar só as partidas novas: guarda só
+    os ids do dia da última partida processada, porque as de dias
+    anteriores já ficam de fora pela data.
+    """
+
+    def __init__(self, competicao, dados=None):
+        dados = dados or {}
+        self.competicao = competicao
+        self.times = [int(t) for t in dados.get("times", [])]
+        self.nomes = dados.get("nomes", {})
+        self.linha = {t: i for i, t in enumerate(self.times)}
+        n = len(self.times)
+        self.elo = np.array(dados.get("elo", []), dtype=float)
+        self.forma_pro = np.array(dados.get("forma_pro", []), dtype=float).reshape(n, JANELA_FORMA)
+        self.forma_contra = np.array(dados.get("forma_contra", []), dtype=float).reshape(n, JANELA_FORMA)
+        self.casa = np.array(dados.get("casa", []), dtype=float).reshape(n, len(SPLITS))
+        self.fora = np.array(dados.get("fora", []), dtype=float).reshape(n, len(SPLITS))
+        self.temporada = dados.get("temporada")
+        self.ultima_data = pd.Timestamp(dados["ultima_data"]) if dados.get("ultima_data") else None
+        self.partidas = set(dados.get("partidas", []))
+
+    @property
+    def desde(self):
+        """Início (UTC) do dia da última partida processada, ou None; as partidas anteriores não são relidas."""
+        return self.ultima_data.floor("D") if self.ultima_data is not None else None
+
+    @classmethod
+    def carregar(cls, competicao, pasta=PASTA_ESTADOS):
+        return cls(competicao, carregar_manifesto(os.path.join(pasta, f"{competicao}.json")))
+
+    def salvar(self, pasta=PASTA_ESTADOS):
+        salvar_manifesto({
+            "times": self.times,
+            "nomes": self.nomes,
+            "elo": self.elo.round(3).tolist(),
+            "forma_pro": _lista(self.forma_pro),
+            "forma_contra": _lista(self.forma_contra),
+            "casa": self.casa.tolist(),
+            "fora": self.fora.tolist(),
+            "temporada": self.temporada,
+            "ultima_data": self.ultima_data.isoformat() if self.ultima_data is not None else None,
+            "partidas": sorted(self.partidas),
+        }, os.path.join(pasta, f"{self.competicao}.json"))
+
+    def _linhas(self, ids):
+        """Linhas dos times, acrescentando (com Elo inicial) os que ainda não existem."""
+        novos = [t for t in pd.unique(ids) if t not in self.linha]
+        if novos:
+            for t in novos:
+                self.linha[t] = len(self.times)
+                self.times.append(int(t))
+            n = len(novos)
+            self.elo = np.concatenate([self.elo, np.full(n, ELO_INICIAL)])
+            self.forma_pro = np.vstack([self.forma_pro, np.full((n, JANELA_FORMA), np.nan)])
+            self.forma_contra = np.vstack([self.forma_contra, np.full((n, JANELA_FORMA), np.nan)])
+            self.casa = np.vstack([self.casa, np.zeros((n, len(SPLITS)))])
+            self.fora = np.vstack([self.fora, np.zeros((n, len(SPLITS)))])
+        return np.array([self.linha[t] for t in ids], dtype=int)
+
+    def _nova_temporada(self, ano):
+        if self.temporada is not None and ano > self.temporada:
+            self.elo = ELO_INICIAL + (1 - REGRESSAO_TEMPORADA) * (self.elo - ELO_INICIAL)
+        self.temporada = ano
+
+    @staticmethod
+    def _empurrar(janela, linhas, valores):
+        """Desloca a janela de forma das linhas e põe o valor mais recente no fim."""
+        janela[linhas, :-1] = janela[linhas, 1:]
+        janela[linhas, -1] = valores
+
+    @staticmethod
+    def _acumular(splits, linhas, gols_pro, gols_contra):
+        splits[linhas] += np.column_stack([
+            np.ones(len(linhas)), gols_pro > gols_contra, gols_pro == gols_contra, gols_pro, gols_contra,
+        ])
+
+    def _lote(self, casa, fora, gols_casa, gols_fora):
+        """
+        Uma rodada de partidas sem times repetidos: todas as atualizações são
+        independentes e feitas de uma vez sobre os arrays. Devolve as
+        variáveis pré-jogo de cada partida.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pre = {
+                "elo_casa": self.elo[casa],
+                "elo_fora": self.elo[fora],
+                "forma_gols_pro_casa": _media_janela(self.forma_pro[casa]),
+                "forma_gols_contra_casa": _media_janela(self.forma_contra[casa]),
+                "forma_gols_pro_fora": _media_janela(self.forma_pro[fora]),
+                "forma_gols_contra_fora": _media_janela(self.forma_contra[fora]),
+                "media_gols_casa_em_casa": self.casa[casa, 3] / self.casa[casa, 0],
+                "media_gols_fora_fora": self.fora[fora, 3] / self.fora[fora, 0],
+                "aproveitamento_casa_em_casa": (3 * self.casa[casa, 1] + self.casa[casa, 2]) / (3 * self.casa[casa, 0]),
+                "aproveitamento_fora_fora": (3 * self.fora[fora, 1] + self.fora[fora, 2]) / (3 * self.fora[fora, 0]),
+            }
+        esperado = 1 / (1 + 10 ** ((pre["elo_fora"] - pre["elo_casa"] - VANTAGEM_MANDANTE) / 400))
+        resultado = np.select([gols_casa > gols_fora, gols_casa == gols_fora], [1.0, 0.5], 0.0)
+        diferenca = np.abs(gols_casa - gols_fora)
+        multiplicador = np.where(diferenca <= 1, 1.0, np.where(diferenca == 2, 1.5, (11 + diferenca) / 8))
+        delta = K_ELO * multiplicador * (resultado - esperado)
+
+        self.elo[casa] += delta
+        self.elo[fora] -= delta
+        self._empurrar(self.forma_pro, casa, gols_casa)
+        self._empurrar(self.forma_contra, casa, gols_fora)
+        self._empurrar(self.forma_pro, fora, gols_fora)
+        self._empurrar(self.forma_contra, fora, gols_casa)
+        self._acumular(self.casa, casa, gols_casa, gols_fora)
+        self._acumular(self.fora, fora, gols_fora, gols_casa)
+
+        pre["esperado_casa"] = esperado
+        pre["elo_casa_depois"] = self.elo[casa]
+        pre["elo_fora_depois"] = self.elo[fora]
+        return pre
+
+    def processar(self, partidas):
+        """
+        Aplica as partidas ainda não processadas, em lotes por dia (um time
+        joga no máximo uma vez por lote), na ordem cronológica. Devolve as
+        variáveis pré-jogo das partidas novas, ou None se alguma delas for
+        anterior à última já processada (é preciso recalcular). Partidas de
+        dias anteriores ao da última processada são ignoradas; uma correção
+        nelas só entra com --recalcular.
+        """
+        if self.desde is not None:
+            partidas = partidas[partidas["utcDate"] >= self.desde]
+        novas = partidas[~partidas["id"].isin(self.partidas)]
+        if novas.empty:
+            return novas.iloc[0:0]
+        if self.ultima_data is not None and novas["utcDate"].min() < self.ultima_data:
+            return None
+
+        novas = novas.sort_values(["utcDate", "id"]).reset_index(drop=True)
+        dia = novas["utcDate"].dt.floor("D")
+        longo = pd.DataFrame({
+            "dia": pd.concat([dia, dia], ignore_index=True),
+            "time": pd.concat([novas["homeTeam_id"], novas["awayTeam_id"]], ignore_index=True),
+            "partida": np.tile(np.arange(len(novas)), 2),
+        })
+        repeticao = longo.groupby(["dia", "time"]).cumcount().groupby(longo["partida"]).max()
+        lotes = pd.DataFrame({"ano": novas["ano"], "dia": dia, "repeticao": repeticao}).groupby(
+            ["ano", "dia", "repeticao"], sort=True).ngroup()
+
+        casa = self._linhas(novas["homeTeam_id"].to_numpy())
+        fora = self._linhas(novas["awayTeam_id"].to_numpy())
+        gols_casa = novas["score_fullTime_home"].to_numpy(dtype=float)
+        gols_fora = novas["score_fullTime_away"].to_numpy(dtype=float)
+
+        resultados = {}
+        for lote, posicoes in pd.Series(np.arange(len(novas))).groupby(lotes.to_numpy()).groups.items():
+            posicoes = np.asarray(posicoes)
+            self._nova_temporada(int(novas["ano"].iloc[posicoes[0]]))
+            pre = self._lote(casa[posicoes], fora[posicoes], gols_casa[posicoes], gols_fora[posicoes])
+            for coluna, valores in pre.items():
+                resultados.setdefault(coluna, np.full(len(novas), np.nan))[posicoes] = valores
+            contar("ratings_lotes")
+
+        ultima_data = novas["utcDate"].max()
+        if self.desde != ultima_data.floor("D"):
+            self.partidas = set()
+        self.partidas.update(int(i) for i in novas.loc[novas["utcDate"] >= ultima_data.floor("D"), "id"])
+        self.ultima_data = ultima_data
+        for time_id, nome in zip(pd.concat([novas["homeTeam_id"], novas["awayTeam_id"]]),
+                                 pd.concat([novas["homeTeam_name"], novas["awayTeam_name"]])):
+            self.nomes[str(time_id)] = nome
+        contar("ratings_partidas", len(novas))
+
+        saida = novas[["id", "ano", "utcDate", "homeTeam_id", "awayTeam_id", "score_fullTime_home", "score_fullTime_away"]]
+        return pd.concat([saida, pd.DataFrame(resultados)], axis=1)
+
+    def tabela(self):
+        """Rating atual, forma e acumulados em casa/fora de cada time."""
+        df = pd.DataFrame({
+            "team_id": self.times,
+            "time": [self.nomes.get(str(t)) for t in self.times],
+            "elo": self.elo.round(1),
+            "forma_gols_pro": _media_janela(self.forma_pro),
+            "forma_gols_contra": _media_janela(self.forma_contra),
+        })
+        for lado, splits in (("casa", self.casa), ("fora", self.fora)):
+            for i, coluna in enumerate(SPLITS):
+                df[f"{coluna}_{lado}"] = splits[:, i].astype(int)
+        return df.sort_values("elo", ascending=False).reset_index(drop=True)
+
+
+def carregar_partidas(competicao, a_partir_de=None, desde=None):
+    """
+    Partidas encerradas da competição (temporadas >= a_partir_de e, se
+    informado, com utcDate >= desde), com tipos do registro de esquemas.
+    """
+    esquema = RegistroEsquemas().esquema("/competitions/{id}/matches [unfold]")
+    tabelas = []
+    for caminho in sorted(PASTA_FOOTBALL_DATA.glob(f"partidas_competicao/{competicao}/*/partidas_*.csv")):
+        ano = int(caminho.parent.name)
+        if a_partir_de is not None and ano < a_partir_de:
+            continue
+        df = ler_csv_tipado(caminho, esquema, sep="_", encoding="utf-8-sig")
+        tabelas.append(df.assign(ano=ano))
+    if not tabelas:
+        return pd.DataFrame()
+    df = pd.concat(tabelas, ignore_index=True)
+    df["utcDate"] = pd.to_datetime(df["utcDate"], utc=True)
+    if desde is not None:
+        df = df[df["utcDate"] >= desde]
+    encerradas = (df["status"] == "FINISHED") & df["score_fullTime_home"].notna() & df["score_fullTime_away"].notna()
+    return df[encerradas].drop_duplicates("id", keep="last")
+
+
+def _gravar_temporada(df, competicao, ano, recalcular):
+    """Acrescenta as partidas novas à partição da temporada (ou a substitui, ao recalcular)."""
+    existente = pd.DataFrame()
+    if not recalcular and caminho_particao(PASTA_DATASET, fonte=FONTE_PARTIDAS, liga=competicao, temporada=ano).exists():
+        existente = carregar_dataset(fonte=FONTE_PARTIDAS, liga=competicao, temporada=str(ano), restaurar_estrutura=False)
+        existente = existente.drop(columns=["fonte", "liga", "temporada", "stat_type"], errors="ignore")
+    df = pd.concat([existente, df], ignore_index=True).drop_duplicates("id", keep="last")
+    salvar_dataset(df, FONTE_PARTIDAS, competicao, ano, "partidas")
+
+
+def atualizar(competicao, recalcular=False):
+    """
+    Atualiza os ratings de uma competição só com as partidas novas. Com
+    recalcular=True (ou se chegar uma partida anterior às já processadas)
+    o estado é refeito a partir de todo o histórico.
+    """
+    estado = EstadoCompeticao(competicao) if recalcular else EstadoCompeticao.carregar(competicao)
+    with etapa("ratings_leitura"):
+        partidas = carregar_partidas(competicao, a_partir_de=estado.temporada, desde=estado.desde)
+    if partidas.empty:
+        return 0
+
+    with etapa("ratings_calculo"):
+        novas = estado.processar(partidas)
+    if novas is None:
+        print(f"  {competicao}: partida anterior às já processadas; recalculando o histórico.")
+        return atualizar(competicao, recalcular=True)
+    if novas.empty:
+        print(f"  {competicao}: nenhuma partida nova.")
+        return 0
+
+    for ano, df_ano in novas.groupby("ano"):
+        _gravar_temporada(df_ano.drop(columns="ano"), competicao, ano, recalcular)
+    salvar_dataset(estado.tabela(), FONTE_TIMES, competicao, None, "atual")
+    estado.salvar()
+    print(f"  {competicao}: {len(novas)} partidas novas processadas.")
+    return len(novas)
+
+
+def competicoes_disponiveis():
+    return sorted(p.name for p in (PASTA_FOOTBALL_DATA / "partidas_competicao").iterdir() if p.is_dir())
+
+
+if __name__ == "__main__":
+    #  Uso: python ratings_times.py [--recalcular] [COMPETIÇÃO ...]
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    for competicao in argumentos or competicoes_disponiveis():
+        atualizar(competicao, recalcular="--recalcular" in sys.argv)
+    telemetria.salvar_relatorio("ratings_times")